@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+قياس تكلفة توحيد النص العربي لكل بطاقة (scrapers/arabic.py): أول مرة (بدون كاش) والمرات التالية (من الكاش)
+مقارنة بتكلفة clean_title قبل التوحيد
+
+    python benchmarks/bench_arabic.py
+    python benchmarks/bench_arabic.py --cards 20000
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.arabic import normalize_text, fold_text, find_percent  # noqa: E402
+
+
+WORDS = ['كوبون', 'خصـــم', 'نون', 'نمشي', 'هنقرستيشن', 'على', 'جميع', 'المُنتجات', 'الأحذية', 'إضافي',
+         'توصيل', 'مجاني', 'للطلبات', 'الأولى', 'مكتبة', 'جرير', 'ساعة', 'ذكية', 'Apple', 'Samsung']
+PERCENTS = ['٥٠٪', '30%', '١٥ ٪', '70 %', '']
+OLD_PERCENT_RE = re.compile(r'(\d+)\s*%')
+
+
+def titles(count, seed=1):
+    rng = random.Random(seed)
+    return [' '.join(rng.choices(WORDS, k=rng.randint(4, 10))) + f" {rng.choice(PERCENTS)} #{i}" for i in range(count)]
+
+
+def old_clean_title(title):
+    """clean_title قبل إضافة التوحيد (للمقارنة)"""
+    title = re.sub(r'<[^>]+>', '', title)
+    title = title.replace('*', '').replace('_', '').replace('[', '').replace(']', '')
+    return ' '.join(title.split())[:100]
+
+
+def per_item(func, items):
+    started = time.perf_counter()
+    for item in items:
+        func(item)
+    return (time.perf_counter() - started) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cards', type=int, default=10000, help="عدد العناوين")
+    args = parser.parse_args()
+    items = titles(args.cards)
+
+    print(f"{'القياس':<28}{'µs/بطاقة':>12}")
+    print(f"{'clean_title القديمة':<28}{per_item(old_clean_title, items):>12.2f}")
+    for name, func in (('normalize_text', normalize_text), ('fold_text', fold_text)):
+        func.cache_clear()
+        print(f"{name + ' (أول مرة)':<28}{per_item(func, items):>12.2f}")
+        print(f"{name + ' (من الكاش)':<28}{per_item(func, items):>12.2f}")
+    print(f"{'find_percent':<28}{per_item(find_percent, items):>12.2f}")
+    found = sum(1 for item in items if find_percent(item))
+    old_found = sum(1 for item in items if OLD_PERCENT_RE.search(item))
+    print(f"\nنسب خصم وُجدت: {found}/{len(items)} (التعبير القديم: {old_found})")
+
+
+if __name__ == "__main__":
+    main()
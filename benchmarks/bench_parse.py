@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+قياس زمن التحليل وذروة الذاكرة لكل مصدر: قبل (html.parser كامل) وبعد (lxml كامل / lxml جزئي)
+
+    python benchmarks/bench_parse.py --live                 # سحب أول صفحة من كل مصدر
+    python benchmarks/bench_parse.py --live --save pages/   # وحفظها للقياس لاحقاً
+    python benchmarks/bench_parse.py --dir pages/           # القياس على صفحات محفوظة (<key>.html)
+    python benchmarks/bench_parse.py --snapshots            # القياس على آخر نسخة في أرشيف الصفحات (SNAPSHOTS=1)
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup  # noqa: E402
+
+from scrapers import http_client  # noqa: E402
+from scrapers.engine import SOURCES, SPEC_SOURCES  # noqa: E402
+from scrapers.parsing import strainer_for  # noqa: E402
+from scrapers.snapshots import snapshots  # noqa: E402
+
+
+def available_modes():
+    modes = [('html.parser', 'html.parser', False)]
+    try:
+        import lxml  # noqa: F401
+        modes += [('lxml', 'lxml', False), ('lxml+partial', 'lxml', True)]
+    except ImportError:
+        print("⚠️ lxml غير مثبت - القياس على html.parser فقط")
+    modes.append(('html.parser+partial', 'html.parser', True))
+    return modes
+
+
+def measure(html, parser, cards, repeat):
+    """أفضل زمن من repeat مرات + ذروة الذاكرة لمرة واحدة"""
+    strainer = strainer_for(cards) if cards else None
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        soup = BeautifulSoup(html, parser, parse_only=strainer)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+        del soup
+    tracemalloc.start()
+    soup = BeautifulSoup(html, parser, parse_only=strainer)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del soup
+    return best, peak
+
+
+# كل المصادر بما فيها المواصفات غير المفعلة في دورة البوت
+ALL_SOURCES = SOURCES + [source for source in SPEC_SOURCES if source not in SOURCES]
+
+
+def load_pages(args):
+    pages = {}
+    for source in ALL_SOURCES:
+        key = source['key']
+        if args.live:
+            url, _ = source['pages']()[0]
+            try:
+                resp = http_client.get(url, timeout=20)
+            except Exception as e:
+                print(f"❌ {key}: {e}")
+                continue
+            if resp.status_code != 200:
+                print(f"❌ {key}: HTTP {resp.status_code}")
+                continue
+            pages[key] = resp.text
+            if args.save:
+                os.makedirs(args.save, exist_ok=True)
+                with open(os.path.join(args.save, f"{key}.html"), 'w', encoding='utf-8') as f:
+                    f.write(resp.text)
+        elif args.snapshots:
+            # أول صفحة لها نسخة محفوظة في الأرشيف
+            for url, _ in source['pages']():
+                resp = snapshots.load(url)
+                if resp is not None:
+                    pages[key] = resp.text
+                    break
+        else:
+            path = os.path.join(args.dir, f"{key}.html")
+            if os.path.exists(path):
+                with open(path, encoding='utf-8') as f:
+                    pages[key] = f.read()
+    return pages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument('--live', action='store_true', help='سحب الصفحات من المواقع')
+    group.add_argument('--dir', help='مجلد فيه <key>.html لكل مصدر')
+    group.add_argument('--snapshots', action='store_true', help='آخر نسخة محفوظة من أرشيف الصفحات')
+    parser.add_argument('--save', help='حفظ الصفحات المسحوبة في هذا المجلد')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    
+    pages = load_pages(args)
+    if not pages:
+        print("لا توجد صفحات للقياس")
+        return 1
+    
+    cards_by_key = {source['key']: source.get('cards') for source in ALL_SOURCES}
+    modes = available_modes()
+    
+    print(f"{'source':<14}{'KB':>7}  " + "".join(f"{name:>23}  " for name, _, _ in modes))
+    for key, html in pages.items():
+        row = f"{key:<14}{len(html.encode()) // 1024:>7}  "
+        for _, parser_name, partial in modes:
+            if partial and not strainer_for(cards_by_key[key] or ''):
+                row += f"{'(no strainer)':>23}  "
+                continue
+            seconds, peak = measure(html, parser_name, cards_by_key[key] if partial else None, args.repeat)
+            row += f"{seconds * 1000:>10.1f}ms {peak / 1024 / 1024:>8.1f}MB  "
+        print(row)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
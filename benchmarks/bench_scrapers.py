@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+قياس مسار السحب كاملاً (طلب HTTP + تحليل + استخراج) لكل السحّابات بدون إنترنت:
+صفحات HTML مسجلة في benchmarks/fixtures/ يقدمها خادم محلي بدل المواقع، وكل سحّاب يعمل في عملية منفصلة
+يطبع صفحات/ث، بطاقات/ث (العروض المستخرجة)، p50/p95 لزمن الصفحة، وذروة الذاكرة (RSS)،
+ويقارن بخط أساس محفوظ - أي تراجع أكبر من --tolerance (أو تغير عدد العروض) ينهي البرنامج بالرمز 1
+
+    python benchmarks/bench_scrapers.py --save-baseline     # حفظ خط الأساس
+    python benchmarks/bench_scrapers.py                     # المقارنة قبل النشر
+    python benchmarks/bench_scrapers.py --only scrape_noon_deals --rounds 20
+"""
+
+import argparse
+import contextlib
+import http.server
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, 'benchmarks', 'fixtures')
+BASELINE = os.path.join(ROOT, 'benchmarks', 'bench_scrapers_baseline.json')
+
+# (الموقع, بداية المسار, الصفحة المسجلة) - أي رابط آخر يرجع 404
+ROUTES = [
+    ('almowafir.com', '/ar/stores/', 'almowafir_store.html'),
+    ('www.couponsaudi.com', '/', 'couponsaudi.html'),
+    ('www.coupon.ae', '/ar/', 'couponarabi.html'),
+    ('www.alcoupon.com', '/ar/', 'couponarabi.html'),
+    ('www.cobone.com', '/ar/deals/', 'cobone.html'),
+    ('www.ilofo.com', '/saudi/offers/', 'ilofo.html'),
+    ('www.noon.com', '/saudi-ar/offers/', 'noon.html'),
+    ('www.extra.com', '/ar-sa/offers', 'extra.html'),
+]
+
+# اسم السحّاب -> الوحدة التي يوجد فيها
+EXTRACTORS = {
+    'scrape_almowafir': 'scrapers.rss_scraper',
+    'scrape_couponsaudi': 'scrapers.rss_scraper',
+    'scrape_couponarabi': 'scrapers.rss_scraper',
+    'scrape_cobone_deals': 'scrapers.scrapers.rss_scraper',
+    'scrape_ilofo_deals': 'scrapers.scrapers.rss_scraper',
+    'scrape_noon_deals': 'scrapers.scrapers.rss_scraper',
+    'scrape_extra_deals': 'scrapers.scrapers.rss_scraper',
+    'scrape_delivery_apps': 'scrapers.scrapers.rss_scraper',
+}
+
+
+# ============== الخادم المحلي ==============
+
+def load_fixtures() -> dict:
+    pages = {}
+    for _, _, name in ROUTES:
+        if name not in pages:
+            with open(os.path.join(FIXTURES, name), 'rb') as f:
+                pages[name] = f.read()
+    return pages
+
+
+def start_server(pages):
+    """خادم على 127.0.0.1 - المسار /<الموقع>/<المسار الأصلي>"""
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            host, _, path = self.path.lstrip('/').partition('/')
+            path = '/' + path
+            name = next((name for route_host, prefix, name in ROUTES if route_host == host and path.startswith(prefix)), None)
+            body = pages.get(name, b'')
+            self.send_response(200 if name else 404)
+            self.send_header('Content-Type', 'text/html; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ============== العملية الفرعية (سحّاب واحد) ==============
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)] if ordered else 0.0
+
+
+def run_child(name, port, rounds):
+    """تشغيل سحّاب واحد rounds مرة عبر الخادم المحلي وطباعة النتيجة JSON"""
+    # ملفات الحالة (كاش HTTP، الجدولة...) في مجلد مؤقت حتى لا تؤثر في القياس
+    os.chdir(tempfile.mkdtemp(prefix='bench_scrapers_'))
+    sys.path.insert(0, ROOT)
+    import importlib
+    from requests.adapters import HTTPAdapter
+    from scrapers import http_client
+    from scrapers.content_hash import card_cache
+    from scrapers.http_cache import get_cache
+
+    requests_at = []
+
+    class LocalAdapter(HTTPAdapter):
+        """كل طلب يذهب للخادم المحلي بدل الموقع (عبر نفس الجلسة ومجمع الاتصالات)"""
+
+        def send(self, request, **kwargs):
+            parts = urlsplit(request.url)
+            request.url = f"http://127.0.0.1:{port}/{parts.netloc}{parts.path}"
+            requests_at.append(time.perf_counter())
+            return super().send(request, **kwargs)
+
+    session = http_client.get_session()
+    adapter = LocalAdapter(pool_connections=4, pool_maxsize=4)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    extractor = getattr(importlib.import_module(EXTRACTORS[name]), name)
+    latencies = []
+    pages = cards = 0
+    elapsed = 0.0
+    # الجولة الأولى للإحماء (الاستيراد الكسول والاتصالات) ولا تُحسب
+    for round_index in range(rounds + 1):
+        # بدون كاش: كل جولة تحلل كل الصفحات من جديد
+        get_cache().entries.clear()
+        card_cache.cards.clear()
+        requests_at.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            offers = extractor()
+            finished = time.perf_counter()
+        if round_index == 0:
+            continue
+        # السحّابات متتابعة: زمن الصفحة من بداية طلبها حتى بداية الطلب التالي (أو نهاية السحّاب)
+        boundaries = requests_at + [finished]
+        latencies.extend(boundaries[i + 1] - boundaries[i] for i in range(len(requests_at)))
+        pages += len(requests_at)
+        cards += len(offers)
+        elapsed += finished - started
+
+    print(json.dumps({
+        'pages': pages // rounds,
+        'cards': cards // rounds,
+        'pages_per_sec': round(pages / elapsed, 2) if elapsed else 0.0,
+        'cards_per_sec': round(cards / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(latencies, 0.5) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        # ru_maxrss بالكيلوبايت على لينكس
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }))
+
+
+# ============== المقارنة ==============
+
+def compare(results, baseline, tolerance) -> list:
+    """قائمة التراجعات مقارنة بخط الأساس"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if result['cards'] != base['cards']:
+            regressions.append(f"{name}: عدد العروض {base['cards']} -> {result['cards']}")
+        if result['pages_per_sec'] < base['pages_per_sec'] * (1 - tolerance):
+            regressions.append(f"{name}: صفحات/ث {base['pages_per_sec']} -> {result['pages_per_sec']}")
+        for key, label in (('p95_ms', 'p95'), ('peak_rss_mb', 'RSS')):
+            if result[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{name}: {label} {base[key]} -> {result[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rounds', type=int, default=5, help="عدد الجولات لكل سحّاب (بعد جولة إحماء)")
+    parser.add_argument('--only', action='append', choices=sorted(EXTRACTORS), help="سحّاب واحد أو أكثر")
+    parser.add_argument('--baseline', default=BASELINE, help="ملف خط الأساس")
+    parser.add_argument('--save-baseline', action='store_true', help="حفظ النتائج كخط أساس جديد")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="أقصى تراجع مقبول (0.2 = 20%%)")
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.port, args.rounds)
+        return 0
+
+    server = start_server(load_fixtures())
+    port = server.server_address[1]
+    results = {}
+    print(f"{'extractor':<24}{'pages':>6}{'cards':>7}{'pages/s':>10}{'cards/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'RSS MB':>9}")
+    for name in args.only or EXTRACTORS:
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--child', name, '--port', str(port), '--rounds', str(args.rounds)],
+            capture_output=True, text=True,
+        )
+        if child.returncode != 0:
+            print(f"❌ {name}: {child.stderr.strip().splitlines()[-1] if child.stderr.strip() else child.returncode}")
+            continue
+        result = results[name] = json.loads(child.stdout.strip().splitlines()[-1])
+        print(f"{name:<24}{result['pages']:>6}{result['cards']:>7}{result['pages_per_sec']:>10.1f}{result['cards_per_sec']:>10.1f}"
+              f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['peak_rss_mb']:>9.1f}")
+    server.shutdown()
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 حُفظ خط الأساس في {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("\nلا يوجد خط أساس للمقارنة (--save-baseline)")
+        return 0
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print("\n⚠️ تراجع عن خط الأساس:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print(f"\n✅ لا تراجع عن خط الأساس (السماحية {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
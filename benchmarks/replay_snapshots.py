@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+إعادة التحليل من أرشيف الصفحات (scrapers/snapshots.py) بدون أي طلب للمواقع:
+للتأكد من إصلاح محلل بعد تعطله، أو لقياس التحليل على صفحات حقيقية
+
+    python benchmarks/replay_snapshots.py
+    python benchmarks/replay_snapshots.py --source almowafir --show 20
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scrapers.engine import SOURCES  # noqa: E402
+from scrapers.rss_scraper import fetch_all_rss_feeds  # noqa: E402
+from scrapers.snapshots import snapshots  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--source', action='append', help="key المصدر (كل المصادر افتراضياً)")
+    parser.add_argument('--show', type=int, default=10, help="عدد العروض المطبوعة")
+    args = parser.parse_args()
+
+    stats = snapshots.stats()
+    print(f"📦 الأرشيف: {stats['urls']} رابط | {stats['objects']} نسخة | {stats['bytes'] / 1024 / 1024:.1f}MB")
+    if args.source:
+        SOURCES[:] = [source for source in SOURCES if source['key'] in args.source]
+
+    started = time.perf_counter()
+    offers = fetch_all_rss_feeds([], replay=True)
+    elapsed = time.perf_counter() - started
+    for offer in offers[:args.show]:
+        print(f"  {offer.get('source', '')}: {offer.get('title', '')} | {offer.get('code') or offer.get('price', '')}")
+    print(f"\n{len(offers)} عرض في {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
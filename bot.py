@@ -3,20 +3,26 @@
 بوت عروض تيليجرام - للسعودية
 """
 
+import asyncio
 import logging
 from datetime import datetime
 
 from telegram import Update
 from telegram.ext import Application, CommandHandler, ContextTypes, MessageHandler, filters
 
-from config import BOT_TOKEN, CHANNEL_ID, ADMIN_IDS, RSS_FEEDS, MESSAGES, SCRAPE_INTERVAL
-from database import init_db, save_offer, mark_as_sent, get_unsent_offers, get_stats, clear_database
+from config import (BOT_TOKEN, CHANNEL_ID, ADMIN_IDS, RSS_FEEDS, MESSAGES, SCRAPE_INTERVAL, PUBLISH_PER_CYCLE, SITEMAP_REFRESH,
+                    COUPON_STALE_AFTER, LIFECYCLE_INTERVAL)
+from database import (init_db, save_offer, mark_as_sent, get_unsent_offers, get_stats, clear_database, get_offer_keys,
+                      touch_offers, mark_checked, expire_offers, update_offer, expire_offer, enrich_offer)
 from utils import create_offer_image
 
 # Setup logging
 logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# دورة السحب الجارية: أي طلب سحب أثناءها ينتظر نتيجتها بدل بدء دورة ثانية
+_scrape_task = None
+
 
 # ============== COMMANDS ==============
 
@@ -45,50 +51,172 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def offers_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """عرض آخر العروض"""
-    offers = get_unsent_offers(5)
+    """عرض آخر العروض - الكوبونات التي لم تظهر مؤخراً نتحقق منها أولاً ونتخطى المنتهية"""
+    from scrapers.lifecycle import revalidate
+    candidates = [dict(offer) for offer in get_unsent_offers(15)]
+    offers = []
+    while candidates and len(offers) < 5:
+        batch, candidates = candidates[:5 - len(offers)], candidates[5 - len(offers):]
+        for offer, alive in await asyncio.to_thread(revalidate, batch):
+            if alive is not None:
+                await asyncio.to_thread(mark_checked, offer['link'], alive, offer['code'])
+            if alive is not False:
+                offers.append(offer)
     if not offers:
         await update.message.reply_text(MESSAGES["no_offers"])
         return
     
     for offer in offers:
-        await send_offer_message(update.message, dict(offer))
+        await send_offer_message(update.message, offer)
 
 
 async def refresh_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """تحديث العروض يدوياً"""
-    await update.message.reply_text(MESSAGES["updating"])
-    await perform_scrape(context)
+    if _scrape_task is not None and not _scrape_task.done():
+        await update.message.reply_text(MESSAGES["already_updating"])
+    else:
+        await update.message.reply_text(MESSAGES["updating"])
+    await perform_scrape(context, force=True)
     await update.message.reply_text("✅ تم التحديث!")
 
 
-async def perform_scrape(context: ContextTypes.DEFAULT_TYPE):
-    """وظيفة السحب والنشر المشتركة (للتحديث اليدوي والتلقائي)"""
+async def perform_scrape(context: ContextTypes.DEFAULT_TYPE, force=False):
+    """وظيفة السحب والنشر المشتركة (للتحديث اليدوي والتلقائي) - دورة واحدة فقط في نفس الوقت"""
+    global _scrape_task
+    if _scrape_task is None or _scrape_task.done():
+        _scrape_task = asyncio.create_task(_scrape_and_post(context.application, force))
+    else:
+        logger.info("Scrape already running - waiting for its result")
+    # shield: إلغاء أحد المنتظرين لا يلغي الدورة المشتركة
+    return await asyncio.shield(_scrape_task)
+
+
+async def _scrape_and_post(app: Application, force):
+    """السحب والحفظ والنشر تدفقياً: كل عرض جديد يُحفظ ويُنشر فور سحبه - force يسحب كل الصفحات بدون الجدولة"""
+    from scrapers import stream_offers
+    from scrapers.canonical import clean_url
+    from scrapers.content_hash import card_cache
+    from scrapers.lifecycle import coupon_code, revalidate
+    from scrapers.near_duplicates import near_duplicates
+    from scrapers.pipeline import run_pipeline, normalize_offer, skip_known, Deduper
+    from scrapers.seen_filter import seen_links
+    
+    # (الرابط, الكود) لكل العروض التي ظهرت في الدورة (آخر ظهور يُحدّث دفعة واحدة بعدها)
+    seen_now = []
+    
+    async def apply_change(offer):
+        """
+        أحداث فرق البطاقات (scrapers/card_diff.py): الجديد يكمل في الخط، والباقي تحديث مباشر لقاعدة البيانات
+        كل كوبون بهويته (الرابط, الكود) لأن كوبونات صفحة المتجر تشترك في رابطها
+        """
+        change = offer.get('change')
+        if change == 'unchanged':
+            seen_now.extend((clean_url(link), code) for link, code in offer['keys'])
+            return None
+        if change == 'removed':
+            await asyncio.to_thread(expire_offer, clean_url(offer['link']), coupon_code(offer))
+            return None
+        if change == 'changed':
+            key = (clean_url(offer['link']), coupon_code(offer))
+            await asyncio.to_thread(update_offer, *key, offer['title'], offer['description'], offer.get('expires_at'))
+            seen_now.append(key)
+            return None
+        return offer
+    
+    def mark_seen(offer):
+        seen_now.append((offer['link'], offer['code']))
+        return offer
+    
+    async def merge_duplicate(offer):
+        """نفس العرض من مصدر آخر (scrapers/near_duplicates.py): نكمل العرض الأساسي في قاعدة البيانات ولا نحفظ المكرر"""
+        canonical, filled = near_duplicates.match(offer)
+        if canonical is None:
+            return offer
+        if filled:
+            await asyncio.to_thread(enrich_offer, canonical['link'], canonical['code'], filled.get('image_url'), filled.get('price'))
+        # المكرر معروف: لا يُفحص ولا يُعد مرة ثانية في الدورات القادمة
+        seen_links.add(offer['link'], offer['code'])
+        return None
+    
+    saved_now = []
+    
+    async def persist(offer):
+        saved = await asyncio.to_thread(
+            save_offer, offer['title'], offer['link'], offer['price'], offer['category'], offer['source'], offer['image_url'], offer['description'], offer.get('expires_at'), offer['code'],
+        )
+        card_cache.mark_saved(offer)
+        seen_links.add(offer['link'], offer['code'])
+        if saved:
+            saved_now.append(offer['link'])
+        return offer if saved else None
+    
+    published = []
+    
+    async def publish(offer):
+        # الباقي فوق الحد يبقى في قاعدة البيانات (/عروض) ويُنشر في الدورات التالية
+        if len(published) < PUBLISH_PER_CYCLE:
+            await send_offer_to_chat(app.bot, CHANNEL_ID, offer)
+            await asyncio.to_thread(mark_as_sent, offer['link'], offer['code'])
+            published.append(offer['link'])
+        return offer
+    
     try:
-        from scrapers import fetch_all_rss_feeds
-        offers = fetch_all_rss_feeds(RSS_FEEDS)
-        
-        count = 0
-        for offer in offers:
-            if save_offer(offer['title'], offer['link'], offer.get('price'), offer.get('category'), offer.get('source'), offer.get('image_url'), offer.get('description')):
-                count += 1
-        
-        if count > 0:
-            await post_to_channel(context.application)
-            return count
+        count = await run_pipeline(
+            stream_offers(feeds=RSS_FEEDS, force=force, diff=True),
+            [
+                ('changes', apply_change), ('normalize', normalize_offer), ('seen', mark_seen), ('dedupe', Deduper()), ('known', skip_known),
+                ('near_duplicates', merge_duplicate), ('persist', persist), ('publish', publish),
+            ],
+        )
+        await asyncio.to_thread(touch_offers, seen_now)
+        # دورة حفظت عروضاً جديدة وبقي مكان في حدها: ننشر ما بقي من الدورات السابقة (الأحدث ظهوراً أولاً)
+        # (الدورات التي لم يستحق فيها شيء أو لم تجد جديداً لا تنشر - الفحص كل SCRAPE_INTERVAL ثانية)
+        # الكوبونات التي لم تظهر مؤخراً نتحقق منها قبل نشرها (كما في /عروض) ونتخطى المنتهية
+        if saved_now and len(published) < PUBLISH_PER_CYCLE:
+            candidates = [dict(offer) for offer in await asyncio.to_thread(get_unsent_offers, 3 * (PUBLISH_PER_CYCLE - len(published)))]
+            while candidates and len(published) < PUBLISH_PER_CYCLE:
+                room = PUBLISH_PER_CYCLE - len(published)
+                batch, candidates = candidates[:room], candidates[room:]
+                for offer, alive in await asyncio.to_thread(revalidate, batch):
+                    if alive is not None:
+                        await asyncio.to_thread(mark_checked, offer['link'], alive, offer['code'])
+                    if alive is not False:
+                        await publish(offer)
+        return count
     except Exception as e:
         logger.error(f"Scrape error: {e}")
     return 0
 
 
 async def scheduled_scrape_job(context: ContextTypes.DEFAULT_TYPE):
-    """وظيفة الجدولة التلقائية"""
-    logger.info("Running scheduled scrape...")
+    """وظيفة الجدولة التلقائية: تسحب الصفحات المستحقة فقط"""
     await perform_scrape(context)
 
 
+async def startup_scrape_job(context: ContextTypes.DEFAULT_TYPE):
+    """أول سحب بعد التشغيل: كل الصفحات لأن قاعدة البيانات مُسحت"""
+    logger.info("Running startup scrape...")
+    await perform_scrape(context, force=True)
+
+
+async def lifecycle_job(context: ContextTypes.DEFAULT_TYPE):
+    """تعليم العروض المنتهية (مضى تاريخها أو اختفت من المواقع) حتى لا تُعرض أو تُنشر"""
+    expired = await asyncio.to_thread(expire_offers, COUPON_STALE_AFTER)
+    if expired:
+        logger.info(f"Expired {expired} offers")
+
+
+async def discovery_job(context: ContextTypes.DEFAULT_TYPE):
+    """تحديث فهرس المتاجر من الـ sitemaps (scrapers/sitemap.py)"""
+    from scrapers.sitemap import discover_stores
+    await asyncio.to_thread(discover_stores)
+
+
 async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """إحصائيات البوت"""
+    from scrapers.circuit_breaker import breaker
+    from scrapers.near_duplicates import near_duplicates
+    from scrapers.scheduler import scheduler
     stats = get_stats()
     msg = f"""
 📊 *إحصائيات البوت*
@@ -96,13 +224,29 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 📦 إجمالي العروض: {stats['total']}
 ✅ تم نشرها: {stats['sent']}
 ⏳ في الانتظار: {stats['pending']}
+⌛ منتهية: {stats['expired']}
+🔁 مكررة من مصادر أخرى (دُمجت): {near_duplicates.merged}
 """
+    breaker_lines = breaker.summary()
+    if breaker_lines:
+        msg += "\n🔌 *المصادر:*\n" + "\n".join(breaker_lines)
+    schedule_lines = scheduler.summary()
+    if schedule_lines:
+        msg += "\n🗓️ *الجدولة:*\n" + "\n".join(schedule_lines)
     await update.message.reply_text(msg, parse_mode='Markdown')
 
 
 async def clear_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """مسح العروض القديمة"""
+    from scrapers.card_diff import card_diff
+    from scrapers.content_hash import card_cache
+    from scrapers.near_duplicates import near_duplicates
+    from scrapers.seen_filter import seen_links
     clear_database()
+    seen_links.clear()
+    near_duplicates.clear()
+    card_diff.clear()
+    card_cache.clear()
     await update.message.reply_text(MESSAGES["cleared"])
 
 
@@ -162,8 +306,9 @@ async def send_offer_to_chat(bot, chat_id, offer: dict):
     """إرسال العرض مع صورة مصممة"""
     caption = format_caption(offer)
     
-    # Generate custom image
-    image_io = create_offer_image(
+    # Generate custom image (في خيط منفصل حتى لا يتوقف خط المعالجة أثناء تحميل الصورة ورسمها)
+    image_io = await asyncio.to_thread(
+        create_offer_image,
         offer.get('image_url'), 
         offer.get('title'), 
         offer.get('price'), 
@@ -196,14 +341,6 @@ async def send_offer_message(message_object, offer: dict):
         await message_object.reply_text(caption, parse_mode='Markdown')
 
 
-async def post_to_channel(app: Application):
-    """نشر العروض للقناة"""
-    offers = get_unsent_offers(5)
-    for offer in offers:
-        await send_offer_to_chat(app.bot, CHANNEL_ID, dict(offer))
-        mark_as_sent(offer['link'])
-
-
 async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """معالجة الأوامر النصية"""
     text = update.message.text
@@ -214,6 +351,7 @@ async def handle_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if t in ['عروض', 'latest']: await offers_command(update, context)
     elif t in ['تحديث', 'refresh']: await refresh_command(update, context)
     elif t in ['مسح', 'clear']: await clear_command(update, context)
+    elif t in ['احصائيات', 'stats']: await stats_command(update, context)
     elif t.startswith('اضافة') or t.startswith('add'): await add_offer_command(update, context)
     elif t in ['مساعدة', 'help', 'start']: await start_command(update, context)
 
@@ -225,6 +363,7 @@ def main():
     
     # Handlers
     app.add_handler(CommandHandler("start", start_command))
+    app.add_handler(CommandHandler("stats", stats_command))
     
     # --- DEBUG & ADMIN ---
     app.add_handler(CommandHandler("debug", debug_command))
@@ -233,14 +372,22 @@ def main():
     # This ensures we start fresh every restart
     clear_database()
     print("🧹 Database force cleared on startup.")
+    # قاعدة البيانات فارغة: كل البطاقات تُعامل كجديدة في أول دورة
+    from scrapers.card_diff import card_diff
+    card_diff.clear()
+    from scrapers.seen_filter import seen_links
+    seen_links.warm(get_offer_keys())
     
     app.add_handler(MessageHandler(filters.TEXT, handle_text))
     
     # Job Queue (Automation)
     if app.job_queue:
-        # Run every 30 minutes (1800 seconds)
-        app.job_queue.run_repeating(scheduled_scrape_job, interval=1800, first=60)
-        print("✅ Automation scheduled (every 30 mins)")
+        # سحب كامل بعد دقيقة، ثم فحص الصفحات المستحقة كل SCRAPE_INTERVAL ثانية (الجدولة في scrapers/scheduler.py)
+        app.job_queue.run_repeating(discovery_job, interval=SITEMAP_REFRESH, first=30)
+        app.job_queue.run_repeating(lifecycle_job, interval=LIFECYCLE_INTERVAL, first=LIFECYCLE_INTERVAL)
+        app.job_queue.run_once(startup_scrape_job, when=60)
+        app.job_queue.run_repeating(scheduled_scrape_job, interval=SCRAPE_INTERVAL, first=60 + SCRAPE_INTERVAL)
+        print(f"✅ Automation scheduled (adaptive, checking every {SCRAPE_INTERVAL}s)")
     else:
         print("⚠️ JobQueue not available")
         
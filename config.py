@@ -9,10 +9,240 @@ CHANNEL_ID = os.environ.get("CHANNEL_ID", "@QQXQQ8")
 ADMIN_IDS = []
 
 # ===== SCRAPING SETTINGS =====
+# كل كم ثانية نفحص الصفحات المستحقة للسحب (الفترة الفعلية لكل صفحة في SCHEDULE_INTERVALS)
 SCRAPE_INTERVAL = 60
 
+# الجدولة التكيفية (scrapers/scheduler.py): فترة سحب كل صفحة بالثواني تبدأ بـ start
+# وتقصر حتى min إذا ظهرت عروض جديدة وتطول حتى max إذا لم تظهر - المفتاح هو key المصدر أو feeds
+SCHEDULE_FILE = "schedule_state.json"
+SCHEDULE_INTERVALS = {
+    "default": {"start": 1800, "min": 600, "max": 6 * 3600},
+    "almowafir": {"min": 900},
+    "ilofo": {"start": 3600, "max": 12 * 3600},
+}
+
+# عدد خيوط الجلب في دورة السحب، وأقصى عدد طلبات متزامنة لنفس الموقع
+SCRAPE_MAX_WORKERS = int(os.environ.get("SCRAPE_MAX_WORKERS", "16"))
+SCRAPE_PER_HOST_CONCURRENCY = int(os.environ.get("SCRAPE_PER_HOST_CONCURRENCY", "4"))
+
+# أقصى مدة لدورة سحب كاملة (ثوانٍ): الصفحات المتأخرة تُلغى ونكمل بما اكتمل
+SCRAPE_DEADLINE = int(os.environ.get("SCRAPE_DEADLINE", "300"))
+
+# خط المعالجة التدفقي (scrapers/pipeline.py): حجم الطابور بين كل مرحلتين، وأقصى عدد عروض ننشرها في القناة كل دورة
+PIPELINE_QUEUE_SIZE = 100
+PUBLISH_PER_CYCLE = 5
+
+# حدود الطلبات لكل موقع (scrapers/rate_limit.py):
+# rate طلب/ثانية، burst أقصى دفعة، التوازي يتكيف بين min و max حسب زمن الاستجابة المستهدف (ثوانٍ)
+RATE_LIMITS = {
+    "default": {"rate": 2.0, "burst": 4, "min_concurrency": 1, "max_concurrency": SCRAPE_PER_HOST_CONCURRENCY, "target_latency": 4.0},
+    "almowafir.com": {"rate": 1.0, "burst": 3},
+}
+
+# سياسة الطلبات لكل موقع (scrapers/request_policy.py) - timeout المصدر هو مهلة القراءة:
+# connect_timeout مهلة الاتصال (ثوانٍ) | retries عدد إعادات المحاولة للأخطاء المؤقتة (اتصال/مهلة/500/502/504)
+# backoff و max_backoff: الانتظار عشوائي بين 0 و backoff * 2^المحاولة (بحد max_backoff)
+# hedge_percentile: إذا تأخر الرد أكثر من هذه النسبة من أزمنة الموقع الأخيرة نرسل طلباً ثانياً ونأخذ الأسرع
+# (بعد hedge_min_samples رد على الأقل، وبحد hedge_budget من عدد الطلبات) - None لإيقافه
+REQUEST_POLICY = {
+    "default": {"connect_timeout": 5, "retries": 2, "backoff": 1.0, "max_backoff": 10.0,
+                "hedge_percentile": None, "hedge_min_samples": 20, "hedge_budget": 0.05},
+    "almowafir.com": {"hedge_percentile": 0.95},
+}
+
+# أرشيف صفحات HTML الخام (scrapers/snapshots.py) لإعادة التحليل بعد إصلاح المحللات بدون طلب المواقع:
+# يُفعّل بـ SNAPSHOTS=1 | نحتفظ بآخر SNAPSHOT_KEEP_PER_URL نسخ لكل رابط، لمدة SNAPSHOT_MAX_AGE ثانية، وبحد SNAPSHOT_MAX_BYTES للأرشيف
+# الضغط zstd إذا كانت مكتبة zstandard مثبتة وإلا gzip
+SNAPSHOTS_ENABLED = os.environ.get("SNAPSHOTS", "0") == "1"
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_KEEP_PER_URL = 3
+SNAPSHOT_MAX_AGE = 7 * 24 * 3600
+SNAPSHOT_MAX_BYTES = 200 * 1024 * 1024
+
+# قاطع الدائرة: بعد عدد مرات فشل متتالية نوقف المصدر/الموقع مؤقتاً (ثوانٍ، تتضاعف مع كل تجربة فاشلة)
+BREAKER_FILE = "breaker_state.json"
+BREAKER_FAILURE_THRESHOLD = 3
+BREAKER_COOLDOWN = 3600
+BREAKER_MAX_COOLDOWN = 6 * 3600
+
+# مجمع اتصالات HTTP المشترك: عدد المواقع المحفوظة، وعدد الاتصالات الدائمة لكل موقع
+HTTP_POOL_HOSTS = 20
+HTTP_POOL_PER_HOST = SCRAPE_PER_HOST_CONCURRENCY
+
+# كاش ETag/Last-Modified لصفحات المتاجر (يبقى بعد إعادة التشغيل)
+HTTP_CACHE_FILE = "http_cache.json"
+# رقم نسخة المحللات: نزيده مع أي إصلاح في استخراج العروض حتى لا تُعاد عروض الكاش القديمة للصفحات التي لم تتغير
+PARSE_VERSION = 5
+
+# عدد بصمات بطاقات العروض المحفوظة في الذاكرة
+CARD_CACHE_SIZE = 5000
+
+# Bloom Filter لروابط العروض المحفوظة (scrapers/seen_filter.py): السعة ونسبة الخطأ (عرض جديد يُعتبر معروفاً)
+SEEN_FILTER_CAPACITY = 100000
+SEEN_FILTER_ERROR_RATE = 0.001
+
+# عدد النصوص المحفوظة نتيجة توحيدها (scrapers/arabic.py)
+ARABIC_CACHE_SIZE = 20000
+
+# كشف العروض المكررة بين المصادر (scrapers/near_duplicates.py): عدد العروض في الفهرس،
+# وأقصى فرق بتات SimHash (64 بت) لاعتبار عرضين نفس العرض - لا يزيد عن 3 (فهرس 4 نطاقات)
+NEAR_DUP_INDEX_SIZE = 5000
+NEAR_DUP_MAX_DISTANCE = 3
+
+# محلل HTML: auto (lxml إن وُجد وإلا html.parser) أو اسم محلل محدد
+HTML_PARSER = os.environ.get("HTML_PARSER", "auto")
+
+# عدد عمليات التحليل المنفصلة (0 = التحليل داخل العملية في خيوط الجلب)
+PARSE_PROCESSES = int(os.environ.get("PARSE_PROCESSES", "0"))
+
 # مصادر سعودية فقط - بدون أجنبي
 RSS_FEEDS = []  # فارغ - نستخدم المواقع السعودية فقط
+# مثال: {"name": "اسم المصدر", "url": "رابط RSS أو Atom", "category": "التصنيف"}
+
+# آخر عنصر مقروء من كل Feed، وأقصى عدد عناصر جديدة نقرأها من Feed في الدورة
+FEED_STATE_FILE = "feed_state.json"
+FEED_MAX_ITEMS = 50
+
+# تصفح الصفحات التالية (scrapers/pagination.py) - اختياري لكل مصدر (key المصدر):
+# max_pages: أقصى عدد صفحات لكل صفحة أساسية، ونتوقف عند أول صفحة كل بطاقاتها معروفة
+# param: معامل رقم الصفحة في الرابط (page افتراضياً) أو template مثل "{url}/page/{page}/"
+# مع التصفح يصبح limit المصدر حداً لكل صفحة
+# مثال: "almowafir": {"max_pages": 3}, "cobone": {"max_pages": 3, "param": "page"}
+PAGINATION = {}
+
+# اكتشاف المتاجر من sitemap.xml (scrapers/sitemap.py) - المفتاح هو key المصدر:
+# store_pattern: تعبير يلتقط slug المتجر من روابط الـ sitemap | store_url: رابط صفحة المتجر من الـ slug
+# max_stores: أقصى عدد متاجر مكتشفة نسحبها (الأحدث تعديلاً أولاً) فوق المتاجر الثابتة
+# المتجر المكتشف لا يُسحب في الدورات العادية إلا إذا تغير lastmod له في الـ sitemap منذ آخر سحب (force يسحب الكل)
+SITEMAPS = {
+    "almowafir": {
+        "url": "https://almowafir.com/sitemap.xml",
+        "store_pattern": r"/ar/stores/([\w-]+)/?$",
+        "store_url": "https://almowafir.com/ar/stores/{slug}/",
+        "max_stores": 200,
+    },
+}
+STORE_INDEX_FILE = "store_index.json"
+# كل كم ثانية نعيد قراءة الـ sitemaps، وأقصى عدد ملفات sitemap (الفهرس + الفرعية) نقرأها في المرة
+SITEMAP_REFRESH = 6 * 3600
+SITEMAP_MAX_FILES = 20
+# المتجر المفهرس الذي لم يتغير lastmod له يُسحب مع ذلك إذا مضت هذه المدة على آخر سحب (أقل من COUPON_STALE_AFTER)
+STORE_REFETCH_AFTER = 24 * 3600
+
+# دورة حياة الكوبون (database.py / scrapers/lifecycle.py) بالثواني:
+# العرض الذي لم يظهر في المواقع منذ COUPON_STALE_AFTER (أو مضى تاريخ انتهائه) يُعلّم منتهياً كل LIFECYCLE_INTERVAL
+# وقبل عرض كوبون في /عروض نتحقق أن كوده ما زال في صفحته إذا لم يظهر منذ COUPON_REVALIDATE_AFTER
+COUPON_STALE_AFTER = 7 * 24 * 3600
+COUPON_REVALIDATE_AFTER = 6 * 3600
+LIFECYCLE_INTERVAL = 3600
+
+# فرق البطاقات (scrapers/card_diff.py): مصادر (key) تولد في دورة البوت أحداث البطاقات الجديدة/المتغيرة/المختفية فقط
+CARD_DIFF_FILE = "card_diff.json"
+CARD_DIFF_SOURCES = {"almowafir"}
+
+# ===== WEBPAGE SOURCES =====
+# مواصفات المواقع لمحرك السحب العام (scrapers/selector_engine.py)
+# selectors: محددات CSS - container للبطاقة، والحقول: title, price, old_price, code, link, image
+# attrs: خصائص نجربها بالترتيب قبل النص (مثل data-original / data-src للصور)
+# required: حقول إذا نقصت نتجاهل البطاقة | defaults: قيم افتراضية
+# title_format / description_format: قوالب تستخدم أسماء الحقول + label
+# embedded_json: نقرأ المنتجات أولاً من JSON المضمن (__NEXT_DATA__ / JSON-LD / window.__STATE__) ونرجع لـ HTML إن لم نجد
+# json_templates: قوالب تبني الحقول من بيانات المنتج الخام في JSON (مثل {sku})
+WEBPAGE_SOURCES = {
+    "noon": {
+        "name": "نون",
+        "category": "تخفيضات",
+        "urls": ["https://www.noon.com/saudi-ar/offers/"],
+        "base_url": "https://www.noon.com",
+        "timeout": 30,
+        "limit": 15,
+        "embedded_json": True,
+        "json_templates": {
+            "link": "https://www.noon.com/saudi-ar/{url}/{sku}/p/",
+            "image": "https://f.nooncdn.com/p/{image_key}.jpg",
+        },
+        "selectors": {
+            "container": '[class*="product"], [class*="item"], article',
+            "title": '[class*="title"], [class*="name"], h3, h4',
+            "price": '[class*="price"], [class*="now"]',
+            "old_price": '[class*="was"], [class*="old"], del, s',
+            "link": 'a[href]',
+            "image": 'img[src]',
+        },
+        "attrs": {"image": ["src"]},
+        "required": ["title", "old_price"],
+        "min_title_length": 6,
+        "title_format": "عرض نون: {title:.60}",
+        "description_format": "احصل على {title} بسعر {price} فقط! (السعر السابق: {old_price})",
+    },
+    "extra": {
+        "name": "اكسترا",
+        "category": "إلكترونيات",
+        "urls": ["https://www.extra.com/ar-sa/offers"],
+        "base_url": "https://www.extra.com",
+        "timeout": 30,
+        "limit": 15,
+        "embedded_json": True,
+        "selectors": {
+            "container": '.product, .item, article, [class*="product"]',
+            "title": '.title, .name, h3, h4, a[title]',
+            "price": '.price, [class*="price"]',
+            "link": 'a[href]',
+            "image": 'img[src]',
+        },
+        "attrs": {"title": ["title"], "image": ["src"]},
+        "required": ["title"],
+        "min_title_length": 6,
+        "title_format": "عرض اكسترا: {title:.60}",
+        "description_format": "عرض خاص من اكسترا على {title}. السعر الحالي: {price}",
+    },
+    "cobone": {
+        "name": "كوبون",
+        "category": "مطاعم",
+        # نسحب من الرياض وجدة
+        "urls": [
+            "https://www.cobone.com/ar/deals/riyadh/food-dining",
+            "https://www.cobone.com/ar/deals/jeddah/food-dining",
+        ],
+        "base_url": "https://www.cobone.com",
+        "timeout": 30,
+        "limit": 10,
+        "selectors": {
+            "container": '.deal-box, .deal_item',
+            "title": '.title, h3, h2',
+            "price": '.price, .actual-price',
+            "link": 'a',
+            "image": 'img',
+        },
+        "attrs": {"image": ["data-original", "src"]},
+        "required": ["title", "link"],
+        "defaults": {"price": "خصم خاص"},
+        "description_format": "عرض مطاعم مميز: {title} بسعر {price}",
+    },
+    "ilofo": {
+        "name": "ilofo",
+        "category": "مطاعم/بنوك",
+        # صفحة المطاعم والمقاهي (غالباً تحتوي على 1+1 وعروض القهوة)
+        "urls": ["https://www.ilofo.com/saudi/offers/restaurants"],
+        "base_url": "https://www.ilofo.com",
+        "timeout": 30,
+        "limit": 15,
+        "selectors": {
+            "container": '.col-md-3, .offer-box, .card',
+            "title": '.card-title, h5, h4, a[title]',
+            "link": 'a',
+            "image": 'img',
+        },
+        "attrs": {"image": ["src", "data-src"]},
+        "required": ["title", "image"],
+        "defaults": {"price": "عرض نشرة"},  # النشرات غالباً فيها أكثر من سعر
+        "description_format": "شاهد تفاصيل العرض: {title}. قد يحتوي على عروض 1+1 أو خصومات بنكية.",
+    },
+}
+
+# مواصفات WEBPAGE_SOURCES التي تدخل دورة السحب والنشر في البوت (key مفصولة بفواصل) - لا شيء افتراضياً:
+# الباقي يعمل فقط عند طلبه (scrape_site / fetch_webpage_offers / stream_offers(sources=...))
+LIVE_WEBPAGE_SOURCES = set(filter(None, os.environ.get("LIVE_WEBPAGE_SOURCES", "").split(",")))
 
 # ===== DATABASE =====
 DATABASE_FILE = "offers.db"
@@ -35,6 +265,7 @@ MESSAGES = {
 """,
     "no_offers": "❌ لا توجد عروض. جرب /تحديث",
     "updating": "🔄 جاري تحديث العروض...",
+    "already_updating": "⏳ يوجد تحديث جارٍ، ننتظر نتيجته...",
     "found_offers": "✅ تم العثور على {count} عرض جديد!",
     "no_new": "ℹ️ لا توجد عروض جديدة",
     "posted": "📢 تم النشر!",
@@ -1,9 +1,22 @@
 import sqlite3
 import os
+from datetime import datetime, timedelta
 
 DATABASE_FILE = "offers.db"
 
 
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+def _link_only_unique(c) -> bool:
+    """هل في الجدول قيد فريد على الرابط وحده (الجداول قبل هوية (الرابط, الكود))؟"""
+    for _, name, unique, *_ in c.execute("PRAGMA index_list(offers)").fetchall():
+        if unique and [row[2] for row in c.execute(f"PRAGMA index_info('{name}')").fetchall()] == ['link']:
+            return True
+    return False
+
+
 def init_db():
     conn = sqlite3.connect(DATABASE_FILE)
     c = conn.cursor()
@@ -13,13 +26,15 @@ def init_db():
         CREATE TABLE IF NOT EXISTS offers (
             id INTEGER PRIMARY KEY,
             title TEXT,
-            link TEXT UNIQUE,
+            link TEXT,
+            code TEXT DEFAULT '',
             price TEXT,
             category TEXT,
             source TEXT,
             image_url TEXT,
             description TEXT,
-            is_sent INTEGER DEFAULT 0
+            is_sent INTEGER DEFAULT 0,
+            UNIQUE (link, code)
         )
     """)
     
@@ -33,23 +48,51 @@ def init_db():
         c.execute("ALTER TABLE offers ADD COLUMN description TEXT")
     except:
         pass
+    
+    # دورة حياة الكوبون: أول/آخر ظهور في المواقع، تاريخ الانتهاء من الصفحة، آخر تحقق، وهل انتهى
+    for column in ("first_seen TEXT", "last_seen TEXT", "expires_at TEXT", "checked_at TEXT", "is_expired INTEGER DEFAULT 0"):
+        try:
+            c.execute(f"ALTER TABLE offers ADD COLUMN {column}")
+        except:
+            pass
+    
+    # هوية العرض (الرابط, كود الكوبون): كوبونات صفحة المتجر الواحدة تشترك في رابطها
+    # الجدول القديم (الرابط وحده فريد) يُعاد بناؤه بنفس أعمدته
+    try:
+        c.execute("ALTER TABLE offers ADD COLUMN code TEXT DEFAULT ''")
+    except:
+        pass
+    if _link_only_unique(c):
+        columns = c.execute("PRAGMA table_info(offers)").fetchall()
+        definitions = ', '.join(
+            f"{name} {kind}" + (" PRIMARY KEY" if pk else "") + (f" DEFAULT {default}" if default is not None else "")
+            for _, name, kind, _, default, pk in columns
+        )
+        names = ', '.join(column[1] for column in columns)
+        c.execute("ALTER TABLE offers RENAME TO offers_old")
+        c.execute(f"CREATE TABLE offers ({definitions}, UNIQUE (link, code))")
+        c.execute(f"INSERT INTO offers ({names}) SELECT {names} FROM offers_old")
+        c.execute("DROP TABLE offers_old")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_offers_pending ON offers (is_sent, is_expired)")
         
     conn.commit()
     conn.close()
     print("Database ready")
 
 
-def save_offer(title, link, price=None, category=None, source=None, image_url=None, description=None):
+def save_offer(title, link, price=None, category=None, source=None, image_url=None, description=None, expires_at=None, code=''):
+    """حفظ عرض جديد - العرض معرّف بـ (الرابط, كود الكوبون)، و code فارغ للعروض بدون كود"""
     if not link:
         return False
     try:
+        now = _now()
         conn = sqlite3.connect(DATABASE_FILE)
         c = conn.cursor()
         c.execute("""
             INSERT OR IGNORE INTO offers 
-            (title, link, price, category, source, image_url, description) 
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (title, link, price, category, source, image_url, description))
+            (title, link, code, price, category, source, image_url, description, first_seen, last_seen, expires_at) 
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, (title, link, code or '', price, category, source, image_url, description, now, now, expires_at or None))
         conn.commit()
         inserted = c.rowcount > 0
         conn.close()
@@ -60,19 +103,108 @@ def save_offer(title, link, price=None, category=None, source=None, image_url=No
 
 
 def get_unsent_offers(limit=10):
+    """العروض غير المنشورة وغير المنتهية (الأحدث ظهوراً أولاً)"""
     conn = sqlite3.connect(DATABASE_FILE)
     conn.row_factory = sqlite3.Row
     c = conn.cursor()
-    c.execute("SELECT * FROM offers WHERE is_sent = 0 LIMIT ?", (limit,))
+    c.execute("""
+        SELECT * FROM offers
+        WHERE is_sent = 0 AND is_expired = 0 AND (expires_at IS NULL OR expires_at >= ?)
+        ORDER BY last_seen DESC LIMIT ?
+    """, (datetime.now().date().isoformat(), limit))
     rows = c.fetchall()
     conn.close()
     return rows
 
 
-def mark_as_sent(link):
+def get_offer_keys():
+    """(الرابط, الكود) لكل العروض المحفوظة (لملء seen_filter عند التشغيل)"""
+    conn = sqlite3.connect(DATABASE_FILE)
+    c = conn.cursor()
+    c.execute("SELECT link, code FROM offers")
+    keys = [(row[0], row[1] or '') for row in c.fetchall()]
+    conn.close()
+    return keys
+
+
+def touch_offers(keys):
+    """العروض [(الرابط, الكود)] التي ظهرت في الدورة الحالية (حتى المعروفة التي لم تُحفظ من جديد): تحديث آخر ظهور دفعة واحدة"""
+    if not keys:
+        return
+    now = _now()
+    conn = sqlite3.connect(DATABASE_FILE)
+    c = conn.cursor()
+    c.executemany("UPDATE offers SET last_seen = ?, is_expired = 0 WHERE link = ? AND code = ?", [(now, link, code or '') for link, code in keys])
+    conn.commit()
+    conn.close()
+
+
+def mark_checked(link, alive, code=''):
+    """نتيجة التحقق من العرض قبل عرضه: ما زال موجوداً في الصفحة أو انتهى"""
+    conn = sqlite3.connect(DATABASE_FILE)
+    c = conn.cursor()
+    if alive:
+        c.execute("UPDATE offers SET checked_at = ?, last_seen = ? WHERE link = ? AND code = ?", (_now(), _now(), link, code or ''))
+    else:
+        c.execute("UPDATE offers SET checked_at = ?, is_expired = 1 WHERE link = ? AND code = ?", (_now(), link, code or ''))
+    conn.commit()
+    conn.close()
+
+
+def update_offer(link, code, title, description, expires_at=None):
+    """كوبون تغير وصفه أو تاريخه في صفحته (نفس الرابط والكود)"""
+    conn = sqlite3.connect(DATABASE_FILE)
+    c = conn.cursor()
+    c.execute("""
+        UPDATE offers SET title = ?, description = ?, expires_at = COALESCE(?, expires_at), last_seen = ?, is_expired = 0
+        WHERE link = ? AND code = ?
+    """, (title, description, expires_at or None, _now(), link, code or ''))
+    conn.commit()
+    conn.close()
+
+
+def enrich_offer(link, code='', image_url=None, price=None):
+    """إكمال صورة/كود عرض محفوظ من نسخة مكررة له في مصدر آخر (الحقول الفارغة فقط - هويته (الرابط, الكود) لا تتغير)"""
+    conn = sqlite3.connect(DATABASE_FILE)
+    c = conn.cursor()
+    c.execute("""
+        UPDATE offers SET image_url = CASE WHEN COALESCE(image_url, '') = '' THEN COALESCE(?, image_url) ELSE image_url END,
+                          price = COALESCE(?, price)
+        WHERE link = ? AND code = ?
+    """, (image_url, price, link, code or ''))
+    conn.commit()
+    conn.close()
+
+
+def expire_offer(link, code):
+    """كوبون اختفى من صفحته"""
+    conn = sqlite3.connect(DATABASE_FILE)
+    c = conn.cursor()
+    c.execute("UPDATE offers SET is_expired = 1 WHERE link = ? AND code = ?", (link, code or ''))
+    conn.commit()
+    conn.close()
+
+
+def expire_offers(stale_after):
+    """تعليم العروض المنتهية: تاريخ انتهائها مضى، أو لم تظهر في المواقع منذ stale_after ثانية - يرجع عددها"""
+    today = datetime.now().date().isoformat()
+    stale = (datetime.now() - timedelta(seconds=stale_after)).isoformat(timespec='seconds')
+    conn = sqlite3.connect(DATABASE_FILE)
+    c = conn.cursor()
+    c.execute("""
+        UPDATE offers SET is_expired = 1
+        WHERE is_expired = 0 AND (expires_at < ? OR last_seen < ?)
+    """, (today, stale))
+    expired = c.rowcount
+    conn.commit()
+    conn.close()
+    return expired
+
+
+def mark_as_sent(link, code=''):
     conn = sqlite3.connect(DATABASE_FILE)
     c = conn.cursor()
-    c.execute("UPDATE offers SET is_sent = 1 WHERE link = ?", (link,))
+    c.execute("UPDATE offers SET is_sent = 1 WHERE link = ? AND code = ?", (link, code or ''))
     conn.commit()
     conn.close()
 
@@ -84,8 +216,10 @@ def get_stats():
     total = c.fetchone()[0]
     c.execute("SELECT COUNT(*) FROM offers WHERE is_sent = 1")
     sent = c.fetchone()[0]
+    c.execute("SELECT COUNT(*) FROM offers WHERE is_sent = 0 AND is_expired = 1")
+    expired = c.fetchone()[0]
     conn.close()
-    return {"total": total, "sent": sent, "pending": total - sent}
+    return {"total": total, "sent": sent, "pending": total - sent - expired, "expired": expired}
 
 
 def clear_database():
@@ -1,4 +1,5 @@
 # Scrapers Package
 from .rss_scraper import fetch_rss_offers, fetch_all_rss_feeds, fetch_webpage_offers
+from .engine import fetch_all_offers, stream_offers
 
-__all__ = ['fetch_rss_offers', 'fetch_all_rss_feeds', 'fetch_webpage_offers']
+__all__ = ['fetch_rss_offers', 'fetch_all_rss_feeds', 'fetch_webpage_offers', 'fetch_all_offers', 'stream_offers']
@@ -0,0 +1,52 @@
+"""
+توحيد النص العربي بجداول تحويل مجمعة مسبقاً (str.translate) ونتائج محفوظة لكل نص:
+normalize_text للعرض (أرقام لاتينية، ٪ -> %، بدون تطويل وتشكيل)
+fold_text للمقارنة والبحث وإزالة التكرار (فوقها: أ/إ/آ -> ا، ى -> ي، ة -> ه، حروف صغيرة)
+"""
+
+import re
+from functools import lru_cache
+
+from config import ARABIC_CACHE_SIZE
+
+
+# الأرقام العربية (٠-٩) والفارسية (۰-۹) -> 0-9، والعلامات العربية -> مقابلها
+_DIGITS = {code: str(code - 0x0660) for code in range(0x0660, 0x066A)}
+_DIGITS.update({code: str(code - 0x06F0) for code in range(0x06F0, 0x06FA)})
+_PUNCTUATION = {'٪': '%', '٫': '.', '٬': ',', '،': ',', '؛': ';', '؟': '?'}
+
+# التطويل (ـ) والتشكيل (الفتحة ... السكون، الألف الخنجرية) تُحذف
+_REMOVE = [0x0640] + list(range(0x064B, 0x0660)) + [0x0670]
+
+DISPLAY_TABLE = str.maketrans({**_DIGITS, **_PUNCTUATION, **{code: None for code in _REMOVE}})
+
+_LETTERS = {'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا', 'ى': 'ي', 'ة': 'ه', 'ؤ': 'و', 'ئ': 'ي'}
+FOLD_TABLE = str.maketrans({**_DIGITS, **_PUNCTUATION, **_LETTERS, **{code: None for code in _REMOVE}})
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_PERCENT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+
+
+def normalize_long_text(text: str) -> str:
+    """normalize_text بدون حفظ النتيجة - لنص بطاقة كامل (قد يكون بحجم الصفحة ولا يتكرر)"""
+    return _WHITESPACE_RE.sub(' ', text.translate(DISPLAY_TABLE)).strip()
+
+
+@lru_cache(maxsize=ARABIC_CACHE_SIZE)
+def normalize_text(text: str) -> str:
+    """نص للعرض: أرقام لاتينية و % بدون تطويل وتشكيل ومسافات زائدة (للنصوص القصيرة المتكررة: العناوين والحقول)"""
+    return normalize_long_text(text)
+
+
+@lru_cache(maxsize=ARABIC_CACHE_SIZE)
+def fold_text(text: str) -> str:
+    """مفتاح مقارنة: normalize_text + توحيد أشكال الحروف + حروف لاتينية صغيرة"""
+    return _WHITESPACE_RE.sub(' ', text.translate(FOLD_TABLE)).strip().lower()
+
+
+def find_percent(text: str):
+    """أول نسبة خصم في النص (50% أو ٥٠٪ أو 50 %) كنص أرقام لاتينية، أو None"""
+    if not text:
+        return None
+    match = _PERCENT_RE.search(text.translate(DISPLAY_TABLE))
+    return match.group(1) if match else None
@@ -0,0 +1,51 @@
+"""
+توحيد روابط العروض قبل الحفظ والمقارنة:
+روابط نسبية/كاملة، noon.com و www.noon.com، ومعاملات التتبع (utm_ وغيرها) كلها تصبح رابطاً واحداً
+"""
+
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+TRACKING_PREFIXES = ('utm_',)
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'msclkid', 'yclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', 'ref', 'ref_src', 'referrer', 'spm', 'scm',
+}
+
+DEFAULT_PORTS = {'http': '80', 'https': '443'}
+
+
+def _is_tracking(param) -> bool:
+    param = param.lower()
+    return param in TRACKING_PARAMS or param.startswith(TRACKING_PREFIXES)
+
+
+def clean_url(url, base=None) -> str:
+    """
+    الرابط الذي نحفظه: كامل، الدومين بحروف صغيرة، بدون المنفذ الافتراضي و # ومعاملات التتبع،
+    وباقي المعاملات مرتبة - يبقى صالحاً للفتح كما هو
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+    if base:
+        url = urljoin(base, url)
+    parts = urlsplit(url)
+    if not parts.netloc:
+        return url
+    scheme = parts.scheme.lower()
+    host = parts.hostname or ''
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    query = sorted((key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(key))
+    return urlunsplit((scheme, host, parts.path or '/', urlencode(query), ''))
+
+
+def url_key(url) -> str:
+    """مفتاح المقارنة: clean_url بدون www ولا / في النهاية ولا فرق بين http و https"""
+    parts = urlsplit(clean_url(url))
+    if not parts.netloc:
+        return url
+    host = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('', host, path, parts.query, '')).lstrip('/')
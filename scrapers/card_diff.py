@@ -0,0 +1,90 @@
+"""
+فرق البطاقات لكل صفحة متجر (المصادر في config.CARD_DIFF_SOURCES): نحفظ بصمات بطاقات كل صفحة
+ونولد الأحداث فقط بدل كل البطاقات - added (كوبون جديد) / changed (نفس الكود بوصف أو تاريخ مختلف) /
+removed (كود اختفى من الصفحة) / unchanged (حدث واحد للصفحة فيه (الرابط, الكود) لبطاقاتها لتحديث آخر ظهور)
+فيكون عمل المراحل التالية (قاعدة البيانات، الصور، النشر) بقدر ما تغير فقط
+"""
+
+from config import CARD_DIFF_FILE
+from .content_hash import offer_key
+from .json_state import JsonState
+from .lifecycle import coupon_code
+
+
+def card_identity(offer) -> str:
+    """هوية البطاقة في صفحتها: كود الكوبون إن وُجد وإلا العنوان"""
+    return coupon_code(offer) or offer.get('title', '')
+
+
+def card_fingerprint(offer) -> str:
+    return f"{offer_key(offer)}|{offer.get('expires_at') or ''}"
+
+
+class CardDiff(JsonState):
+    """لكل صفحة: هوية البطاقة -> [البصمة, الرابط, السعر/الكود, العنوان, المصدر] - يبقى بعد إعادة التشغيل"""
+
+    label = 'بصمات البطاقات'
+    pages = JsonState.data
+
+    def __init__(self, path=CARD_DIFF_FILE):
+        super().__init__(path)
+        self.counts = {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 0}
+
+    def diff(self, url, offers, limit=None) -> list:
+        """
+        أحداث الصفحة مقارنة بآخر مرة - البطاقات الجديدة والمتغيرة عروض عادية فيها change
+        limit يحد البطاقات الجديدة فقط (حد الصفحة): الزائدة لا تُحفظ فتظهر جديدة حين يتسع لها الحد،
+        وبطاقة نزل ترتيبها تحت الحد لا تُعد مختفية لأن المقارنة على الصفحة كلها
+        """
+        current = {}
+        for offer in offers:
+            current.setdefault(card_identity(offer), offer)
+        with self.lock:
+            previous = self.pages.get(url, {})
+
+        events = []
+        unchanged = []
+        added = 0
+        for identity, offer in list(current.items()):
+            old = previous.get(identity)
+            if old is None:
+                if limit and added >= limit:
+                    del current[identity]
+                    continue
+                added += 1
+                events.append(dict(offer, change='added'))
+            elif old[0] != card_fingerprint(offer):
+                events.append(dict(offer, change='changed'))
+            else:
+                unchanged.append((offer.get('link', ''), coupon_code(offer)))
+        for identity, (_, link, price, title, source) in previous.items():
+            if identity not in current:
+                events.append({'change': 'removed', 'link': link, 'price': price, 'title': title, 'source': source})
+        if unchanged:
+            events.append({'change': 'unchanged', 'link': url, 'keys': sorted(set(unchanged))})
+
+        with self.lock:
+            self.pages[url] = {
+                identity: [card_fingerprint(offer), offer.get('link', ''), offer.get('price', ''), offer.get('title', ''), offer.get('source', '')]
+                for identity, offer in current.items()
+            }
+            for event in events:
+                self.counts[event['change']] += 1
+        return events
+
+    def reset_counts(self):
+        with self.lock:
+            for key in self.counts:
+                self.counts[key] = 0
+
+    def report(self) -> str:
+        with self.lock:
+            counts = dict(self.counts)
+        return f"جديدة {counts['added']} | متغيرة {counts['changed']} | اختفت {counts['removed']} | صفحات بدون تغيير {counts['unchanged']}"
+
+    def clear(self):
+        with self.lock:
+            self.pages.clear()
+
+
+card_diff = CardDiff()
@@ -0,0 +1,89 @@
+"""
+قاطع دائرة لكل مصدر ولكل موقع: بعد فشل متكرر نتوقف عن المصدر لفترة تهدئة
+بدل انتظار المهلة كاملة في كل دورة، ثم نجربه بطلب واحد (نصف مفتوح)
+الحالة محفوظة على القرص وتظهر في /stats
+"""
+
+import time
+
+from config import BREAKER_FILE, BREAKER_FAILURE_THRESHOLD, BREAKER_COOLDOWN, BREAKER_MAX_COOLDOWN
+from .json_state import JsonState
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker(JsonState):
+    """مفاتيح مثل source:almowafir أو host:coupon.ae"""
+
+    label = 'حالة القواطع'
+    entries = JsonState.data
+
+    def __init__(self, path=BREAKER_FILE):
+        super().__init__(path)
+        self.probing = set()
+
+    def _entry(self, key):
+        return self.entries.setdefault(key, {'state': CLOSED, 'failures': 0, 'opened_at': 0, 'cooldown': BREAKER_COOLDOWN})
+
+    def state(self, key):
+        entry = self.entries.get(key)
+        if not entry:
+            return CLOSED
+        if entry['state'] == OPEN and time.time() - entry['opened_at'] >= entry['cooldown']:
+            entry['state'] = HALF_OPEN
+        return entry['state']
+
+    def allow(self, key) -> bool:
+        """هل نرسل الطلب؟ في حالة نصف مفتوح نسمح بطلب تجربة واحد فقط"""
+        state = self.state(key)
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and key not in self.probing:
+            self.probing.add(key)
+            return True
+        return False
+
+    def success(self, key):
+        self.probing.discard(key)
+        if key in self.entries:
+            if self.entries[key]['state'] != CLOSED:
+                print(f"🟢 عاد للعمل: {key}")
+            del self.entries[key]
+
+    def failure(self, key):
+        self.probing.discard(key)
+        entry = self._entry(key)
+        entry['failures'] += 1
+        if entry['state'] == HALF_OPEN:
+            # فشلت التجربة: نعيد الفتح بمدة تهدئة مضاعفة
+            entry['cooldown'] = min(entry['cooldown'] * 2, BREAKER_MAX_COOLDOWN)
+            self._open(key, entry)
+        elif entry['state'] == CLOSED and entry['failures'] >= BREAKER_FAILURE_THRESHOLD:
+            self._open(key, entry)
+
+    def _open(self, key, entry):
+        entry['state'] = OPEN
+        entry['opened_at'] = time.time()
+        print(f"🔴 إيقاف مؤقت {key} لمدة {entry['cooldown'] // 60:.0f} دقيقة (فشل {entry['failures']} مرات)")
+
+    def summary(self) -> list:
+        """سطر لكل مصدر/موقع غير سليم (المفتاح بين ` حتى لا يكسر Markdown)"""
+        lines = []
+        now = time.time()
+        for key in sorted(self.entries):
+            state = self.state(key)
+            entry = self.entries[key]
+            if state == OPEN:
+                remaining = entry['cooldown'] - (now - entry['opened_at'])
+                lines.append(f"🔴 `{key}`: متوقف ({entry['failures']} فشل) - تجربة بعد {remaining / 60:.0f} د")
+            elif state == HALF_OPEN:
+                lines.append(f"🟡 `{key}`: تجربة في الدورة القادمة ({entry['failures']} فشل)")
+            else:
+                lines.append(f"🟠 `{key}`: {entry['failures']} فشل متتالي")
+        return lines
+
+
+breaker = CircuitBreaker()
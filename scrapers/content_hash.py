@@ -0,0 +1,99 @@
+"""
+بصمات المحتوى: تخطي تحليل الصفحات والبطاقات التي لم تتغير
+(لمواقع لا ترسل ETag / Last-Modified)
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from config import CARD_CACHE_SIZE
+
+
+# أجزاء تتغير مع كل طلب بدون أن يتغير المحتوى الفعلي
+_COMMENT_RE = re.compile(r'<!--.*?-->', re.S)
+_VOLATILE_ATTR_RE = re.compile(r'\s(?:nonce|data-csrf|data-token|data-timestamp|data-request-id)="[^"]*"', re.I)
+_CSRF_META_RE = re.compile(r'<meta[^>]+name="csrf[^"]*"[^>]*>', re.I)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode('utf-8', 'ignore'), digest_size=16).hexdigest()
+
+
+def normalize_body(html: str) -> str:
+    """تطبيع HTML قبل البصمة: حذف التعليقات والقيم المتغيرة والمسافات"""
+    html = _COMMENT_RE.sub('', html)
+    html = _CSRF_META_RE.sub('', html)
+    html = _VOLATILE_ATTR_RE.sub('', html)
+    return _WHITESPACE_RE.sub(' ', html).strip()
+
+
+def body_hash(html: str) -> str:
+    return _digest(normalize_body(html))
+
+
+def offer_key(offer) -> str:
+    """بصمة العرض نفسه (العنوان + الرابط + السعر/الكود) بغض النظر عن شكل البطاقة"""
+    return _digest(f"{offer.get('title', '')}|{offer.get('link', '')}|{offer.get('price', '')}")[:16]
+
+
+def card_hash(card, *context) -> str:
+    """بصمة بطاقة عرض واحدة (عنصر BeautifulSoup) مع سياقها (رابط الصفحة، اسم المتجر...)"""
+    return _digest(repr(context) + _WHITESPACE_RE.sub(' ', str(card)))
+
+
+class CardCache:
+    """
+    كاش في الذاكرة: بصمة البطاقة -> العرض المستخرج منها
+    البطاقة غير المتغيرة لا يُعاد استخراجها، وإن حُفظ عرضها في هذه الجلسة لا نعيد save_offer
+    (في الذاكرة فقط لأن قاعدة البيانات تُمسح عند كل تشغيل)
+    """
+
+    def __init__(self, max_size=CARD_CACHE_SIZE):
+        self.max_size = max_size
+        self.cards = OrderedDict()
+        self.saved = set()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def extract(self, card, extract_fn, *args):
+        """استخراج العرض من البطاقة أو إرجاعه من الكاش - يرجع dict أو None"""
+        key = card_hash(card, *args)
+        with self.lock:
+            if key in self.cards:
+                self.cards.move_to_end(key)
+                self.hits += 1
+                offer = self.cards[key]
+                return dict(offer) if offer else None
+            self.misses += 1
+        
+        offer = extract_fn(card, *args)
+        if offer:
+            offer['fingerprint'] = key
+        with self.lock:
+            self.cards[key] = offer
+            if len(self.cards) > self.max_size:
+                old_key, _ = self.cards.popitem(last=False)
+                self.saved.discard(old_key)
+        return dict(offer) if offer else None
+
+    def is_saved(self, offer) -> bool:
+        """هل مر هذا العرض (نفس البطاقة) على save_offer في هذه الجلسة؟"""
+        key = offer.get('fingerprint')
+        return bool(key) and key in self.saved
+
+    def mark_saved(self, offer):
+        key = offer.get('fingerprint')
+        if key:
+            self.saved.add(key)
+
+    def clear(self):
+        """بعد مسح قاعدة البيانات: لا شيء محفوظ (البطاقات المستخرجة تبقى صالحة)"""
+        with self.lock:
+            self.saved.clear()
+
+
+card_cache = CardCache()
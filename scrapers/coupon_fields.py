@@ -0,0 +1,174 @@
+"""
+مستخرج موحد لحقول بطاقة الكوبون: نمر على عناصر البطاقة مرة واحدة ونجمع كل الحقول المرشحة
+(الكود من data-code / data-coupon / data-clipboard-text أو عنصر class فيه code أو input نصي،
+نسبة الخصم، السعر، تاريخ الانتهاء، العنوان، الوصف، الرابط، الصورة) بتعبيرات مجمعة مسبقاً
+مع قياس عدد البطاقات وزمن الاستخراج لكل موقع
+"""
+
+import re
+import threading
+import time
+from datetime import date
+from typing import NamedTuple
+
+from bs4.element import NavigableString, PreformattedString, Tag
+
+from .arabic import normalize_text, normalize_long_text
+
+
+CODE_ATTRS = ('data-code', 'data-coupon', 'data-clipboard-text')
+IMAGE_ATTRS = ('data-original', 'data-src', 'src')
+HEADING_TAGS = ('h2', 'h3', 'h4')
+SUMMARY_TAGS = ('h3', 'h4', 'p', 'span')
+
+PERCENT_RE = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+PRICE_RE = re.compile(r'(\d[\d,]*(?:\.\d+)?)\s*(ريال|ر\.س|SAR)', re.I)
+# ينتهي 31/12 | صالح حتى 2026-11-30 | تاريخ الانتهاء: 30.11.2026 | Expires 30/11/26
+# "حتى" وحدها لا تكفي (خصم حتى 12.5% / التوصيل حتى 3-4 أيام)، والرقم المتبوع بـ % أو عملة أو مدة ليس تاريخاً
+EXPIRY_RE = re.compile(
+    r'(?:ينتهي|تنتهي|الانتهاء|صالح|صالحة|ساري|سارية|expires?|expiry|valid until)\D{0,20}?'
+    r'(\d{1,4})[/\-.](\d{1,2})(?:[/\-.](\d{2,4}))?'
+    r'(?![\d.,]*\s*(?:%|ريال|ر\.س|SAR|أيام|ايام|يوم|ساعة|ساعات|days?|hours?))',
+    re.I,
+)
+
+
+class CouponFields(NamedTuple):
+    """الحقول المستخرجة من بطاقة واحدة ("" إذا لم يوجد الحقل)"""
+    code: str
+    percent: str
+    price: str
+    heading: str
+    summary: str
+    link: str
+    image: str
+    text: str
+    expires: str
+
+    @property
+    def discount(self) -> str:
+        return f"{self.percent}%" if self.percent else ""
+
+
+def find_price(text) -> str:
+    """أول سعر بالريال في نص موحد (199 ريال / 1,299 ر.س / 50 SAR)"""
+    match = PRICE_RE.search(text)
+    return f"{match.group(1)} {match.group(2)}" if match else ""
+
+
+def find_expiry(text, today=None) -> str:
+    """
+    تاريخ انتهاء الكوبون في نص موحد كـ YYYY-MM-DD أو "" - الأرقام بترتيب يوم/شهر/سنة إلا إذا بدأت بسنة
+    بدون سنة: هذه السنة، إلا إذا كان التاريخ قد مضى بأكثر من نصف سنة فالسنة القادمة
+    """
+    match = EXPIRY_RE.search(text)
+    if not match:
+        return ""
+    first, second, third = match.groups()
+    today = today or date.today()
+    if len(first) == 4:
+        year, month, day = int(first), int(second), int(third or 0)
+    else:
+        day, month = int(first), int(second)
+        year = int(third) if third else today.year
+        if third and len(third) == 2:
+            year += 2000
+    try:
+        expires = date(year, month, day)
+    except ValueError:
+        return ""
+    if not third and (today - expires).days > 182:
+        expires = expires.replace(year=year + 1)
+    return expires.isoformat()
+
+
+def _classes(tag) -> str:
+    value = tag.get('class')
+    if not value:
+        return ''
+    return (' '.join(value) if isinstance(value, list) else value).lower()
+
+
+def _walk(card) -> CouponFields:
+    attr_code = input_code = ''
+    code_el = heading_el = summary_el = None
+    link = image = ''
+    parts = []
+
+    for node in [card, *card.descendants]:
+        if isinstance(node, NavigableString):
+            if not isinstance(node, PreformattedString):
+                parts.append(node)
+            continue
+        if not isinstance(node, Tag):
+            continue
+        attrs = node.attrs
+        if not attr_code:
+            for attr in CODE_ATTRS:
+                if attrs.get(attr):
+                    attr_code = attrs[attr].strip()
+                    break
+        name = node.name
+        classes = _classes(node) if 'class' in attrs else ''
+        # البطاقة نفسها لا تُعتبر عنصر الكود (class مثل coupon-code-box يجعل كل نصها كوداً)
+        if code_el is None and node is not card and 'code' in classes:
+            code_el = node
+        if name == 'input' and not input_code and attrs.get('type') == 'text' and attrs.get('value'):
+            input_code = attrs['value'].strip()
+        elif name in HEADING_TAGS and heading_el is None:
+            heading_el = node
+        elif name == 'a' and not link and attrs.get('href'):
+            link = attrs['href'].strip()
+        elif name == 'img' and not image:
+            image = next((attrs[attr].strip() for attr in IMAGE_ATTRS if attrs.get(attr)), '')
+        if summary_el is None and name in SUMMARY_TAGS and ('title' in classes or 'desc' in classes):
+            summary_el = node
+
+    text = normalize_long_text(''.join(parts)) if parts else ''
+    percent = PERCENT_RE.search(text)
+    return CouponFields(
+        code=attr_code or (code_el.get_text(strip=True) if code_el is not None else '') or input_code,
+        percent=percent.group(1) if percent else '',
+        price=find_price(text),
+        heading=normalize_text(heading_el.get_text(' ', strip=True)) if heading_el is not None else '',
+        summary=normalize_text(summary_el.get_text(' ', strip=True)) if summary_el is not None else '',
+        link=link,
+        image=image,
+        text=text,
+        expires=find_expiry(text) if text else '',
+    )
+
+
+class ExtractionStats:
+    """عدد البطاقات وزمن استخراجها لكل موقع (داخل العملية الحالية فقط)"""
+
+    def __init__(self):
+        self.sites = {}
+        self.lock = threading.Lock()
+
+    def record(self, site, seconds):
+        with self.lock:
+            cards, total = self.sites.get(site, (0, 0.0))
+            self.sites[site] = (cards + 1, total + seconds)
+
+    def reset(self):
+        with self.lock:
+            self.sites.clear()
+
+    def report(self) -> list:
+        with self.lock:
+            return [
+                f"{site}: {cards} بطاقة - {total / cards * 1e6:.0f}µs/بطاقة ({cards / total:.0f} بطاقة/ث)"
+                for site, (cards, total) in sorted(self.sites.items()) if total > 0
+            ]
+
+
+extraction_stats = ExtractionStats()
+
+
+def extract_fields(card, site='') -> CouponFields:
+    """كل حقول بطاقة الكوبون في مرور واحد - site للقياس فقط"""
+    started = time.perf_counter()
+    fields = _walk(card)
+    extraction_stats.record(site, time.perf_counter() - started)
+    return fields
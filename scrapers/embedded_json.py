@@ -0,0 +1,187 @@
+"""
+استخراج المنتجات من JSON المضمن في صفحات المتاجر المبنية بـ JavaScript (نون، اكسترا):
+__NEXT_DATA__ و JSON-LD (Product / Offer) و window.__STATE__ وما يشبهها
+البحث بتعبيرات نمطية على النص الخام ثم فك JSON (بـ orjson إن وُجد) بدون بناء شجرة HTML
+"""
+
+import json
+import re
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+_SCRIPT_RE = re.compile(r'<script\b([^>]*)>(.*?)</script>', re.S | re.I)
+_JSON_SCRIPT_RE = re.compile(r'__NEXT_DATA__|application/(?:ld\+)?json', re.I)
+# window.__STATE__ = {...}; و window.__INITIAL_STATE__ و window.__PRELOADED_STATE__ ...
+_STATE_RE = re.compile(r'window\.(?:__[A-Z_]*STATE__|__NEXT_DATA__|__NUXT__)\s*=\s*', re.I)
+
+TITLE_KEYS = ('name', 'title', 'product_name', 'productName', 'displayName')
+PRICE_KEYS = ('sale_price', 'salePrice', 'offer_price', 'offerPrice', 'final_price', 'finalPrice', 'now_price', 'price')
+OLD_PRICE_KEYS = ('was_price', 'wasPrice', 'old_price', 'oldPrice', 'original_price', 'originalPrice', 'list_price', 'listPrice', 'strike_price')
+LINK_KEYS = ('url', 'link', 'href', 'canonical_url', 'canonicalUrl', 'slug')
+IMAGE_KEYS = ('image', 'image_url', 'imageUrl', 'thumbnail', 'images', 'image_key')
+
+CURRENCIES = {'SAR': 'ريال'}
+DEFAULT_CURRENCY = 'ريال'
+
+# حد أعلى للمنتجات من صفحة واحدة
+MAX_PRODUCTS = 200
+
+_decoder = json.JSONDecoder()
+
+
+def _decode_state(text):
+    """قيمة window.X = {...}; - نفك أول قيمة JSON فقط ونتجاهل باقي السكربت"""
+    text = text.strip()
+    try:
+        return _loads(text.rstrip(';').strip())
+    except ValueError:
+        pass
+    try:
+        return _decoder.raw_decode(text)[0]
+    except ValueError:
+        return None
+
+
+def embedded_documents(html):
+    """يولد كل مستندات JSON المضمنة في الصفحة"""
+    for attrs, body in _SCRIPT_RE.findall(html):
+        if _JSON_SCRIPT_RE.search(attrs):
+            try:
+                yield _loads(body.strip())
+            except ValueError:
+                continue
+            continue
+        match = _STATE_RE.search(body)
+        if match:
+            doc = _decode_state(body[match.end():])
+            if doc is not None:
+                yield doc
+
+
+def _first(raw, keys):
+    for key in keys:
+        value = raw.get(key)
+        if value not in (None, '', [], {}):
+            return key, value
+    return None, None
+
+
+def _is_type(raw, name):
+    kind = raw.get('@type')
+    return kind == name or (isinstance(kind, list) and name in kind)
+
+
+def _price_text(value, currency=None):
+    """199 أو "199.00" -> "199 ريال" (النص غير الرقمي يبقى كما هو)"""
+    if isinstance(value, dict):
+        value = value.get('value') or value.get('amount')
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value).strip() if value else ""
+    if number <= 0:
+        return ""
+    number = int(number) if number.is_integer() else round(number, 2)
+    return f"{number} {CURRENCIES.get(currency, currency) or DEFAULT_CURRENCY}"
+
+
+def _image_url(value):
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get('url') or value.get('contentUrl')
+    return value if isinstance(value, str) else ""
+
+
+def _apply_templates(product, raw, templates):
+    """قوالب المواصفة لبناء الروابط من حقول المنتج (مثل sku و image_key في نون)"""
+    for field, template in (templates or {}).items():
+        try:
+            product[field] = template.format_map(raw)
+        except (KeyError, IndexError, ValueError):
+            continue
+
+
+def _ld_product(raw):
+    """Product من JSON-LD (schema.org)"""
+    offers = raw.get('offers') or {}
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    if _is_type(offers, 'AggregateOffer') and 'price' not in offers:
+        offers = dict(offers, price=offers.get('lowPrice'))
+    currency = offers.get('priceCurrency')
+    old_price = ""
+    spec = offers.get('priceSpecification')
+    for item in spec if isinstance(spec, list) else [spec] if spec else []:
+        if isinstance(item, dict) and 'ListPrice' in str(item.get('priceType', '')):
+            old_price = _price_text(item.get('price'), item.get('priceCurrency') or currency)
+    return {
+        'title': str(raw.get('name') or ''),
+        'price': _price_text(offers.get('price'), currency),
+        'old_price': old_price,
+        'link': offers.get('url') or raw.get('url') or '',
+        'image': _image_url(raw.get('image')),
+    }
+
+
+def _state_product(raw):
+    """منتج من حالة التطبيق (Next.js / Redux): أي كائن فيه عنوان وسعر"""
+    _, title = _first(raw, TITLE_KEYS)
+    price_key, price = _first(raw, PRICE_KEYS)
+    if not isinstance(title, str) or price is None or isinstance(price, (list, bool)):
+        return None
+    price_text = _price_text(price, raw.get('currency') or raw.get('currency_code'))
+    if not price_text:
+        return None
+    _, old_price = _first(raw, OLD_PRICE_KEYS)
+    if old_price is None and price_key != 'price':
+        # sale_price موجود: price هو السعر قبل الخصم
+        old_price = raw.get('price')
+    _, link = _first(raw, LINK_KEYS)
+    _, image = _first(raw, IMAGE_KEYS)
+    return {
+        'title': title,
+        'price': price_text,
+        'old_price': _price_text(old_price) if old_price is not None else "",
+        'link': link if isinstance(link, str) else "",
+        'image': _image_url(image),
+    }
+
+
+def iter_products(doc, templates=None):
+    """يمر على المستند بدون استدعاء ذاتي ويولد المنتجات - لا ندخل داخل المنتج نفسه (الخيارات والمقاسات)"""
+    stack = [doc]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, list):
+            stack.extend(reversed(node))
+            continue
+        if not isinstance(node, dict):
+            continue
+        product = _ld_product(node) if _is_type(node, 'Product') else _state_product(node)
+        if product and product['title']:
+            _apply_templates(product, node, templates)
+            yield product
+            continue
+        stack.extend(reversed(list(node.values())))
+
+
+def extract_products(html, templates=None) -> list:
+    """كل المنتجات من JSON المضمن (بدون تكرار) - قائمة فارغة إذا لم يوجد JSON يحوي منتجات"""
+    products = []
+    seen = set()
+    for doc in embedded_documents(html):
+        for product in iter_products(doc, templates):
+            key = (product['title'], product['link'])
+            if key in seen:
+                continue
+            seen.add(key)
+            products.append(product)
+            if len(products) >= MAX_PRODUCTS:
+                return products
+    return products
@@ -0,0 +1,467 @@
+"""
+محرك السحب غير المتزامن - يسحب كل المصادر وكل صفحات المتاجر في نفس الوقت
+ويولد العروض تدفقياً فور اكتمال كل صفحة
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import SCRAPE_MAX_WORKERS, SCRAPE_DEADLINE, PIPELINE_QUEUE_SIZE, WEBPAGE_SOURCES, LIVE_WEBPAGE_SOURCES, CARD_DIFF_SOURCES
+from . import http_client
+from .card_diff import card_diff
+from .content_hash import body_hash
+from .coupon_fields import extraction_stats
+from .circuit_breaker import breaker, HALF_OPEN
+from .feeds import get_feed_state, read_feed_items
+from .http_cache import get_cache
+from .pagination import paging_for, page_url, known_cards
+from .parse_pool import parse_page
+from .rate_limit import rate_limiter, host_key
+from .request_policy import policy_for, split_timeout, backoff_delay, should_retry, latency_tracker, RETRY_ERRORS
+from .scheduler import scheduler
+from .selector_engine import spec_source
+from .sitemap import store_index
+from .snapshots import snapshots
+from .rss_scraper import (
+    almowafir_pages, parse_almowafir_store, ALMOWAFIR_CARDS, ALMOWAFIR_PAGE_LIMIT,
+    couponsaudi_pages, parse_couponsaudi, COUPONSAUDI_CARDS,
+    couponarabi_pages, parse_couponarabi, COUPONARABI_LIMIT,
+)
+
+
+# كل مصدر: مفتاح + اسم + دالة ترجع الصفحات [(url, label)] + دالة تحليل (html, url, label) -> offers
+# cards: محدد البطاقات المستخدم في التحليل الجزئي (للقياس في benchmarks/)
+# limit: أقصى عدد عروض للمصدر في الدورة | page_limit: أقصى عدد عروض من كل صفحة
+# مع التصفح (config.PAGINATION) يصبح limit وحده الحد لكل صفحة (بدونه تُقرأ كل بطاقات الصفحة)
+SOURCES = [
+    {
+        'key': 'almowafir',
+        'name': 'الموفر',
+        'pages': almowafir_pages,
+        'parse': parse_almowafir_store,
+        'cards': ALMOWAFIR_CARDS,
+        'timeout': 15,
+        'page_limit': ALMOWAFIR_PAGE_LIMIT,
+    },
+    {
+        'key': 'couponsaudi',
+        'name': 'كوبون سعودي',
+        'pages': couponsaudi_pages,
+        'parse': parse_couponsaudi,
+        'cards': COUPONSAUDI_CARDS,
+        'timeout': 15,
+    },
+    {
+        'key': 'couponarabi',
+        'name': 'كوبون عربي',
+        'pages': couponarabi_pages,
+        'parse': parse_couponarabi,
+        'cards': 'div, article',
+        'timeout': 15,
+        'limit': COUPONARABI_LIMIT,
+    },
+]
+
+# المواقع المعرّفة بمواصفات CSS في config.WEBPAGE_SOURCES - تدخل الدورة الافتراضية فقط إذا كانت في LIVE_WEBPAGE_SOURCES
+SPEC_SOURCES = [spec_source(key, spec) for key, spec in WEBPAGE_SOURCES.items()]
+SOURCES += [source for source in SPEC_SOURCES if source['key'] in LIVE_WEBPAGE_SOURCES]
+
+
+class ScrapeRun:
+    """حالة دورة سحب واحدة: مجمع الخيوط والكاش ومهلة الدورة (حدود كل موقع في rate_limiter)"""
+
+    def __init__(self, max_workers=SCRAPE_MAX_WORKERS, deadline=SCRAPE_DEADLINE, replay=False, diff=False):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="scrape")
+        self.cache = get_cache()
+        self.cache.reset_stats()
+        extraction_stats.reset()
+        self.deadline = time.monotonic() + deadline
+        self.timed_out = []
+        # replay: التحليل من النسخ المحفوظة (scrapers/snapshots.py) بدون طلبات ولا تغيير في حالة الجدولة والقاطع
+        self.replay = replay
+        # diff: صفحات CARD_DIFF_SOURCES تولد أحداث الفرق فقط (scrapers/card_diff.py)
+        self.diff = diff and not replay
+        card_diff.reset_counts()
+
+    def remaining(self) -> float:
+        """الثواني المتبقية من مهلة الدورة"""
+        return max(self.deadline - time.monotonic(), 0.0)
+
+    async def run_blocking(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, *args)
+
+    def close(self):
+        # الطلبات المتأخرة التي بدأت تكمل في خيوطها وتُهمل نتيجتها، وما لم يبدأ يُلغى
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def _attempt(run: ScrapeRun, url, timeouts, headers, admitted=None):
+    """طلب واحد عبر محدد الموقع بدون حجز حلقة الأحداث - admitted (asyncio.Event) يُضبط لحظة سماح المحدد بالطلب"""
+    async with rate_limiter.request(url) as ticket:
+        if admitted is not None:
+            admitted.set()
+        started = time.monotonic()
+        try:
+            resp = await run.run_blocking(http_client.get, url, headers, timeouts)
+        except Exception:
+            latency_tracker.record(url, None)
+            raise
+        ticket.record(resp)
+    latency_tracker.record(url, time.monotonic() - started)
+    return resp
+
+
+def _forget(task):
+    # الطلب الأبطأ يكمل في خيطه وتُهمل نتيجته (وخطؤه)
+    if not task.cancelled():
+        task.exception()
+
+
+async def _hedged(run: ScrapeRun, url, timeouts, headers, policy):
+    """إذا تأخر الرد أكثر من المعتاد للموقع نرسل طلباً ثانياً ونأخذ الأسرع"""
+    admitted = asyncio.Event()
+    first = asyncio.ensure_future(_attempt(run, url, timeouts, headers, admitted))
+    delay = latency_tracker.hedge_delay(url, policy)
+    if delay is None or delay >= run.remaining():
+        return await first
+    # انتظار دور الطلب في محدد الموقع ليس بطئاً من الموقع: المهلة تبدأ من لحظة إرسال الطلب الأول
+    admission = asyncio.ensure_future(admitted.wait())
+    await asyncio.wait({first, admission}, return_when=asyncio.FIRST_COMPLETED)
+    admission.cancel()
+    if first.done() or delay >= run.remaining():
+        return await first
+    done, _ = await asyncio.wait({first}, timeout=delay)
+    if done:
+        return first.result()
+    latency_tracker.count(url, 'hedges')
+    second = asyncio.ensure_future(_attempt(run, url, timeouts, headers))
+    pending = {first, second}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None or not pending:
+                for other in pending:
+                    other.add_done_callback(_forget)
+                if task is second and task.exception() is None:
+                    latency_tracker.count(url, 'hedge_wins')
+                return task.result()
+
+
+async def fetch_page(run: ScrapeRun, url, timeout, headers=None):
+    """
+    جلب صفحة واحدة بسياسة الموقع (scrapers/request_policy.py) - يرجع الاستجابة كاملة
+    الأخطاء المؤقتة تُعاد بانتظار أسي عشوائي ما دام في مهلة الدورة وقت
+    """
+    policy = policy_for(url)
+    timeouts = split_timeout(policy, timeout)
+    attempt = 0
+    while True:
+        resp = error = None
+        try:
+            resp = await _hedged(run, url, timeouts, headers, policy)
+        except RETRY_ERRORS as e:
+            error = e
+        if resp is not None and not should_retry(resp):
+            return resp
+        delay = backoff_delay(attempt, policy)
+        if attempt >= policy['retries'] or delay >= run.remaining():
+            if error is not None:
+                raise error
+            return resp
+        latency_tracker.count(url, 'retries')
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def scrape_page(run: ScrapeRun, source, url, label):
+    """جلب وتحليل صفحة واحدة من مصدر (مع GET شرطي) - يرجع (نجح؟, العروض)، ونجح None إذا تخطينا الصفحة"""
+    name = source['name']
+    if run.replay:
+        return await replay_page(run, source, url, label)
+    host = f"host:{host_key(url)}"
+    if not breaker.allow(host):
+        return None, []
+    try:
+        resp = await fetch_page(run, url, source.get('timeout', 15), run.cache.conditional_headers(url))
+    except asyncio.CancelledError:
+        # ألغتها مهلة الدورة: لا نجاح ولا فشل، لكن نحرر تجربة نصف المفتوح حتى تُعاد في الدورة القادمة
+        breaker.probing.discard(host)
+        raise
+    except Exception as e:
+        breaker.failure(host)
+        run.cache.miss(name)
+        print(f"  خطأ {label}: {e}")
+        return False, []
+    
+    if resp.status_code >= 500:
+        breaker.failure(host)
+    else:
+        breaker.success(host)
+    
+    try:
+        if resp.status_code == 304:
+            return True, run.cache.hit(name, url)
+        if resp.status_code != 200:
+            run.cache.miss(name)
+            return False, []
+        if snapshots.enabled:
+            await run.run_blocking(snapshots.save, url, resp)
+        digest = await run.run_blocking(body_hash, resp.text)
+        cached = run.cache.unchanged(name, url, digest)
+        if cached is not None:
+            return True, cached
+        started = time.perf_counter()
+        offers = await parse_page(run, source['parse'], resp, url, label)
+        run.cache.store(name, url, resp, offers, time.perf_counter() - started, digest)
+        return True, offers
+    except Exception as e:
+        run.cache.miss(name)
+        print(f"  خطأ {label}: {e}")
+        return False, []
+
+
+async def replay_page(run: ScrapeRun, source, url, label):
+    """تحليل آخر نسخة محفوظة من الصفحة بدل جلبها - نفس نتيجة scrape_page"""
+    try:
+        resp = await run.run_blocking(snapshots.load, url)
+        if resp is None:
+            return None, []
+        return True, await parse_page(run, source['parse'], resp, url, label)
+    except Exception as e:
+        print(f"  خطأ {label}: {e}")
+        return False, []
+
+
+def due_pages(source, force=False, replay=False) -> list:
+    """
+    صفحات المصدر التي حان موعد سحبها حسب الجدولة (كلها مع force، وكل ما له نسخة محفوظة مع replay)
+    بدون force: المتاجر المفهرسة من الـ sitemap تُسحب فقط إذا تغير lastmod لها (أو مضى STORE_REFETCH_AFTER على آخر سحب)،
+    وإذا فشل سحبها الأخير تنتظر موعدها في الجدولة (postpone) بدل إعادتها كل دورة
+    """
+    if replay:
+        return [(url, label) for url, label in source['pages']() if snapshots.has(url)]
+    if force:
+        return list(source['pages']())
+    due = []
+    for url, label in source['pages']():
+        moved = store_index.moved(url)
+        if moved is None or (moved and store_index.failing(url)):
+            is_due = scheduler.due(source['key'], url)
+        else:
+            is_due = moved
+        if is_due:
+            due.append((url, label))
+    return due
+
+
+async def scrape_source(run: ScrapeRun, source, pages):
+    """
+    سحب صفحات مصدر واحد المستحقة بالتوازي - يولد العروض فور اكتمال كل صفحة
+    مع التصفح (config.PAGINATION): الصفحة التالية تُضاف للمهام إذا كانت في الصفحة الحالية بطاقة جديدة
+    """
+    key = f"source:{source['key']}"
+    if not run.replay and not breaker.allow(key):
+        print(f"⏸️ {source['name']}: متوقف مؤقتاً")
+        for url, _ in pages:
+            scheduler.postpone(source['key'], url)
+        return
+    if not run.replay and breaker.state(key) == HALF_OPEN:
+        # تجربة بصفحة واحدة فقط
+        pages = pages[:1]
+    paging = paging_for(source['key'])
+    diffing = run.diff and source['key'] in CARD_DIFF_SOURCES
+    # لكل مهمة: (رابط الصفحة, الاسم, رقمها, الرابط الأساسي)
+    tasks = {asyncio.ensure_future(scrape_page(run, source, url, label)): (url, label, 1, url) for url, label in pages}
+    pending = set(tasks)
+    outcomes = []
+    yielded = 0
+    limit = source.get('limit')
+    page_limit = source.get('page_limit')
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, timeout=run.remaining(), return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # انتهت مهلة الدورة: الصفحات الباقية تبقى مستحقة للدورة القادمة
+                run.timed_out.extend(tasks[task][1] for task in pending)
+                break
+            for task in done:
+                url, label, page, base_url = tasks[task]
+                ok, page_offers = task.result()
+                if page == 1 and not run.replay:
+                    # الجدولة والقاطع على الصفحة الأساسية فقط
+                    outcomes.append(ok)
+                    if ok:
+                        scheduler.record(source['key'], url, page_offers)
+                        store_index.fetched(url)
+                    else:
+                        scheduler.postpone(source['key'], url)
+                        store_index.failed(url)
+                if ok and paging and page < paging['max_pages'] and page_offers and known_cards.has_new(source['key'], page_offers):
+                    next_url = page_url(base_url, page + 1, paging)
+                    next_task = asyncio.ensure_future(scrape_page(run, source, next_url, f"{label} ({page + 1})"))
+                    tasks[next_task] = (next_url, label, page + 1, base_url)
+                    pending.add(next_task)
+                # مع التصفح: الحد لكل صفحة بدل المصدر كله
+                cap = limit if paging else page_limit
+                if ok and diffing:
+                    # الفرق على الصفحة كلها والحد على البطاقات الجديدة فقط
+                    page_offers = card_diff.diff(url, page_offers, cap)
+                elif cap:
+                    page_offers = page_offers[:cap]
+                for offer in page_offers:
+                    if offer.get('change', 'added') == 'added':
+                        if limit and not paging and yielded >= limit:
+                            continue
+                        yielded += 1
+                    yield offer
+    finally:
+        for task in pending:
+            task.cancel()
+        if not run.replay:
+            # كل الصفحات تُخطيت بسبب قاطع الموقع أو أُلغي المصدر مع الدورة: نحرر تجربة نصف المفتوح
+            # (success/failure أدناه تحدد النتيجة إذا اكتملت صفحة)
+            breaker.probing.discard(key)
+    
+    if run.replay:
+        return
+    if any(outcomes):
+        breaker.success(key)
+    elif False in outcomes:
+        breaker.failure(key)
+
+
+async def _read_feed(run: ScrapeRun, feed):
+    async with rate_limiter.request(feed['url']) as ticket:
+        result = await run.run_blocking(read_feed_items, feed['url'], feed['name'], feed.get('category', 'عروض متنوعة'))
+        ticket.status = 200
+    return result
+
+
+async def scrape_feed(run: ScrapeRun, feed):
+    """قراءة Feed واحد من config.RSS_FEEDS - يولد العناصر الجديدة"""
+    key = f"feed:{feed['url']}"
+    if not breaker.allow(key):
+        print(f"⏸️ {feed['name']}: متوقف مؤقتاً")
+        scheduler.postpone('feeds', feed['url'])
+        return
+    try:
+        offers, newest = await asyncio.wait_for(_read_feed(run, feed), run.remaining())
+    except asyncio.TimeoutError:
+        # انتهت مهلة الدورة: لا نحدث نقطة التوقف حتى لا تضيع العناصر، ونحرر تجربة نصف المفتوح
+        breaker.probing.discard(key)
+        run.timed_out.append(feed['name'])
+        return
+    except asyncio.CancelledError:
+        breaker.probing.discard(key)
+        raise
+    except Exception:
+        breaker.failure(key)
+        scheduler.postpone('feeds', feed['url'])
+        raise
+    breaker.success(key)
+    if newest:
+        get_feed_state().update(feed['url'], *newest)
+    scheduler.record('feeds', feed['url'], offers)
+    for offer in offers:
+        yield offer
+
+
+async def stream_offers(sources=None, feeds=None, force=False, deadline=SCRAPE_DEADLINE, queue_size=PIPELINE_QUEUE_SIZE, replay=False, diff=False):
+    """
+    مرحلة الجلب والتحليل في خط المعالجة (scrapers/pipeline.py): تولد العروض فور اكتمال كل صفحة
+    كل المصادر تعمل بالتوازي وتكتب في طابور محدود، فإذا تأخر المستهلك تنتظر ولا تتراكم العروض في الذاكرة
+    force: تجاهل الجدولة وسحب كل الصفحات (التحديث اليدوي وأول دورة بعد التشغيل)
+    deadline: مهلة الدورة كاملة بالثواني - ما لم يكتمل قبلها يُلغى ونكمل بما اكتمل
+    replay: تحليل آخر نسخة محفوظة من كل صفحة (scrapers/snapshots.py) بدون طلبات - الـ Feeds لا تُحفظ فتُتخطى
+    diff: مصادر CARD_DIFF_SOURCES تولد أحداث change (added / changed / removed / unchanged) بدل كل البطاقات
+    """
+    sources = sources if sources is not None else SOURCES
+    feeds = [] if replay else feeds or []
+    plan = [(source, due_pages(source, force, replay)) for source in sources]
+    plan = [(source, pages) for source, pages in plan if pages]
+    feeds = [feed for feed in feeds if force or scheduler.due('feeds', feed['url'])]
+    if not plan and not feeds:
+        if replay:
+            print("⚠️ لا توجد نسخ محفوظة لإعادة التحليل")
+        return
+    
+    run = ScrapeRun(deadline=deadline, replay=replay, diff=diff)
+    started = time.monotonic()
+    http_before = http_client.connection_stats()
+    
+    print("=" * 50)
+    print("🔁 إعادة التحليل من النسخ المحفوظة..." if replay else "🚀 سحب الكوبونات الحقيقية...")
+    print("=" * 50)
+    
+    queue = asyncio.Queue(maxsize=queue_size)
+    streams = [(source['name'], scrape_source(run, source, pages)) for source, pages in plan]
+    streams += [(feed['name'], scrape_feed(run, feed)) for feed in feeds]
+    counts = [0] * len(streams)
+    
+    async def produce(index, offers):
+        try:
+            async for offer in offers:
+                await queue.put(offer)
+                counts[index] += 1
+        except Exception as e:
+            counts[index] = e
+    
+    async def produce_all():
+        await asyncio.gather(*(produce(index, offers) for index, (_, offers) in enumerate(streams)))
+        await queue.put(None)
+    
+    producer = asyncio.create_task(produce_all())
+    try:
+        while True:
+            offer = await queue.get()
+            if offer is None:
+                break
+            yield offer
+    finally:
+        producer.cancel()
+        run.close()
+        run.cache.save()
+        breaker.save()
+        scheduler.save()
+        store_index.save()
+        if run.diff:
+            card_diff.save()
+        if snapshots.enabled and not replay:
+            removed = await asyncio.to_thread(snapshots.prune)
+            snapshots.save_index()
+            if removed:
+                print(f"📦 حُذفت {removed} نسخة قديمة من الأرشيف")
+        if feeds:
+            get_feed_state().save()
+    
+    for (name, _), count in zip(streams, counts):
+        if isinstance(count, Exception):
+            print(f"❌ {name}: {count}")
+        else:
+            print(f"✅ {name}: {count}")
+    
+    print("=" * 50)
+    if run.timed_out:
+        print(f"⌛ انتهت مهلة الدورة ({deadline}s) قبل: {len(run.timed_out)} صفحة ({', '.join(sorted(set(run.timed_out)))})")
+    http_after = http_client.connection_stats()
+    total = sum(count for count in counts if not isinstance(count, Exception))
+    print(f"✅ إجمالي: {total} ({time.monotonic() - started:.1f}s)")
+    print(f"🔌 طلبات: {http_after['requests'] - http_before['requests']} | اتصالات جديدة: {http_after['connections'] - http_before['connections']}")
+    for line in run.cache.report():
+        print(f"💾 {line}")
+    for line in extraction_stats.report():
+        print(f"🧩 {line}")
+    for state in rate_limiter.state():
+        print(f"🚦 {state['host']}: توازي {state['concurrency']}/{state['max_concurrency']} | زمن {state['latency']}s | تقييد {state['throttled']} | انتظار {state['blocked_for']}s")
+    if run.diff:
+        print(f"🧮 فرق البطاقات: {card_diff.report()}")
+    for line in latency_tracker.report():
+        print(f"🔁 {line}")
+    print(f"⏱️ الصفحة المستحقة التالية بعد {scheduler.seconds_until_due() / 60:.0f} د")
+
+
+async def fetch_all_offers(sources=None, feeds=None, force=False, deadline=SCRAPE_DEADLINE, replay=False):
+    """سحب كل العروض المستحقة في قائمة واحدة (لمن يحتاجها دفعة واحدة بدل التدفق)"""
+    return [offer async for offer in stream_offers(sources, feeds, force, deadline, replay=replay)]
@@ -0,0 +1,181 @@
+"""
+قراءة RSS / Atom تدفقياً (iterparse) بدون بناء الشجرة كاملة
+ونتوقف عند أول عنصر شوهد سابقاً (GUID أو تاريخ النشر)
+"""
+
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+from config import FEED_STATE_FILE, FEED_MAX_ITEMS
+from .arabic import find_percent
+from .json_state import JsonState
+from .request_policy import get as http_get
+
+
+ATOM_NS = '{http://www.w3.org/2005/Atom}'
+MEDIA_NS = '{http://search.yahoo.com/mrss/}'
+CONTENT_NS = '{http://purl.org/rss/1.0/modules/content/}'
+
+ITEM_TAGS = ('item', f'{ATOM_NS}entry')
+
+_TAG_RE = re.compile(r'<[^>]+>')
+
+
+class FeedState(JsonState):
+    """آخر GUID وتاريخ نشر لكل Feed (يبقى بعد إعادة التشغيل)"""
+
+    label = 'حالة الـ Feeds'
+    feeds = JsonState.data
+
+    def __init__(self, path=FEED_STATE_FILE):
+        super().__init__(path)
+
+    def get(self, feed_url) -> dict:
+        return self.feeds.get(feed_url, {})
+
+    def update(self, feed_url, guid, published):
+        self.feeds[feed_url] = {'guid': guid, 'published': published.isoformat() if published else None}
+
+
+_state = None
+
+
+def get_feed_state() -> FeedState:
+    global _state
+    if _state is None:
+        _state = FeedState()
+    return _state
+
+
+def _text(elem, *tags):
+    for tag in tags:
+        child = elem.find(tag)
+        if child is not None and child.text:
+            return child.text.strip()
+    return ""
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _link(elem):
+    link = elem.find('link')
+    if link is not None and link.text:
+        return link.text.strip()
+    # Atom: <link rel="alternate" href="..."/>
+    for link in elem.iter(f'{ATOM_NS}link'):
+        if link.get('rel', 'alternate') == 'alternate' and link.get('href'):
+            return link.get('href')
+    return ""
+
+
+def _image(elem):
+    enclosure = elem.find('enclosure')
+    if enclosure is not None and (enclosure.get('type') or '').startswith('image'):
+        return enclosure.get('url', '')
+    for tag in (f'{MEDIA_NS}content', f'{MEDIA_NS}thumbnail'):
+        media = elem.find(tag)
+        if media is not None and media.get('url'):
+            return media.get('url')
+    return ""
+
+
+def iter_feed_items(stream):
+    """
+    يولد (guid, published, element) لكل عنصر item/entry أثناء القراءة (iterparse)
+    ثم يحذفه من العنصر الأب (parents) فلا تتراكم العناصر المقروءة في شجرة channel
+    """
+    parents = []
+    for event, elem in ET.iterparse(stream, events=('start', 'end')):
+        if event == 'start':
+            parents.append(elem)
+            continue
+        parents.pop()
+        if elem.tag not in ITEM_TAGS:
+            continue
+        guid = _text(elem, 'guid', f'{ATOM_NS}id') or _link(elem)
+        published = _parse_date(_text(elem, 'pubDate', f'{ATOM_NS}updated', f'{ATOM_NS}published'))
+        yield guid, published, elem
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+
+
+def _item_offer(elem, feed_name, category):
+    title = _TAG_RE.sub('', _text(elem, 'title', f'{ATOM_NS}title'))
+    title = ' '.join(title.split())
+    if not title:
+        return None
+    summary = _text(elem, f'{CONTENT_NS}encoded', 'description', f'{ATOM_NS}summary', f'{ATOM_NS}content')
+    summary = ' '.join(_TAG_RE.sub('', summary).split())
+    percent = find_percent(f"{title} {summary}")
+    return {
+        'title': title[:100],
+        'link': _link(elem),
+        'price': f"{percent}%" if percent else "",
+        'category': category,
+        'source': feed_name,
+        'image_url': _image(elem),
+        'description': summary[:200],
+        'date': datetime.now().isoformat()
+    }
+
+
+def read_feed_items(feed_url, feed_name, category, max_items=FEED_MAX_ITEMS):
+    """
+    سحب العناصر الجديدة فقط من Feed واحد بدون تحديث الحالة
+    يرجع (العروض, نقطة التوقف الجديدة (guid, published) أو None)
+    """
+    last = get_feed_state().get(feed_url)
+    last_guid = last.get('guid')
+    last_published = _parse_date(last.get('published'))
+    
+    offers = []
+    newest = None
+    resp = http_get(feed_url, timeout=15, stream=True)
+    try:
+        if resp.status_code != 200:
+            return [], None
+        resp.raw.decode_content = True
+        
+        for guid, published, elem in iter_feed_items(resp.raw):
+            # وصلنا لما قرأناه في الدورة السابقة - لا داعي لإكمال القراءة
+            if guid and guid == last_guid:
+                break
+            if published and last_published and published <= last_published:
+                break
+            # أحدث عنصر جديد (بالتاريخ إن وجد، وإلا أول عنصر) نحفظه كنقطة توقف للدورة القادمة
+            if newest is None or (published and (newest[1] is None or published > newest[1])):
+                newest = (guid, published)
+            offer = _item_offer(elem, feed_name, category)
+            if offer and offer['link']:
+                offers.append(offer)
+            if len(offers) >= max_items:
+                break
+    except ET.ParseError as e:
+        print(f"خطأ قراءة {feed_name}: {e}")
+    finally:
+        resp.close()
+    return offers, newest
+
+
+def read_feed(feed_url, feed_name, category, max_items=FEED_MAX_ITEMS):
+    """سحب العناصر الجديدة فقط من Feed واحد وحفظ نقطة التوقف"""
+    offers, newest = read_feed_items(feed_url, feed_name, category, max_items)
+    if newest:
+        get_feed_state().update(feed_url, *newest)
+    return offers
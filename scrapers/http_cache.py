@@ -0,0 +1,126 @@
+"""
+كاش GET الشرطي (ETag / Last-Modified) لصفحات المتاجر
+عند رد 304 أو صفحة لم تتغير بصمتها نعيد العروض المستخرجة سابقاً بدون تحليل الصفحة من جديد
+"""
+
+import time
+from collections import defaultdict
+
+from config import HTTP_CACHE_FILE, PARSE_VERSION
+from .content_hash import body_hash
+from .http_client import get as http_get
+from .json_state import JsonState
+
+
+class ValidatorCache(JsonState):
+    """
+    كاش دائم على القرص: لكل رابط ETag/Last-Modified وبصمة المحتوى وآخر عروض مستخرجة
+    مع رقم نسخة المحللات (config.PARSE_VERSION) - المدخل من نسخة أخرى لا يُستخدم حتى تُحلل الصفحة من جديد
+    """
+
+    label = 'كاش HTTP'
+    entries = JsonState.data
+
+    def __init__(self, path=HTTP_CACHE_FILE):
+        super().__init__(path)
+        self.stats = defaultdict(lambda: {'requests': 0, 'hits': 0, 'hash_hits': 0, 'bytes_saved': 0, 'parse_saved': 0.0})
+
+    def _entry(self, url):
+        entry = self.entries.get(url)
+        if not entry or entry.get('parse_version') != PARSE_VERSION:
+            return None
+        return entry
+
+    def conditional_headers(self, url) -> dict:
+        """ترويسات If-None-Match / If-Modified-Since للرابط إن وجدت (بدونها يرجع الموقع الصفحة كاملة)"""
+        entry = self._entry(url)
+        if not entry:
+            return {}
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def hit(self, source, url):
+        """رد 304: نرجع العروض المحفوظة ونحسب ما وفرناه"""
+        entry = self._entry(url) or {}
+        stats = self.stats[source]
+        stats['requests'] += 1
+        stats['hits'] += 1
+        stats['bytes_saved'] += entry.get('size', 0)
+        stats['parse_saved'] += entry.get('parse_seconds', 0.0)
+        return list(entry.get('offers', []))
+
+    def unchanged(self, source, url, digest):
+        """رد 200 بنفس بصمة المحتوى السابقة (body_hash): نرجع العروض المحفوظة بدون تحليل، وإلا None"""
+        entry = self._entry(url)
+        if not entry or entry.get('body_hash') != digest:
+            return None
+        stats = self.stats[source]
+        stats['requests'] += 1
+        stats['hash_hits'] += 1
+        stats['parse_saved'] += entry.get('parse_seconds', 0.0)
+        return list(entry.get('offers', []))
+
+    def store(self, source, url, resp, offers, parse_seconds, digest=None):
+        """رد 200 بمحتوى جديد: نحفظ المحققات والبصمة مع العروض المستخرجة"""
+        self.stats[source]['requests'] += 1
+        self.entries[url] = {
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'body_hash': digest,
+            'size': len(resp.content),
+            'parse_seconds': round(parse_seconds, 4),
+            'offers': offers,
+            'parse_version': PARSE_VERSION,
+        }
+
+    def miss(self, source):
+        """طلب لم يُخدم من الكاش (خطأ أو رد غير 200/304)"""
+        self.stats[source]['requests'] += 1
+
+    def reset_stats(self):
+        self.stats.clear()
+
+    def report(self) -> list:
+        """سطر لكل مصدر: نسبة الإصابة والبايتات وثواني التحليل الموفرة"""
+        lines = []
+        for source, s in self.stats.items():
+            hits = s['hits'] + s['hash_hits']
+            rate = (hits / s['requests'] * 100) if s['requests'] else 0
+            lines.append(f"{source}: {hits}/{s['requests']} ({rate:.0f}%، 304: {s['hits']}، بصمة: {s['hash_hits']}) - وفرنا {s['bytes_saved'] // 1024}KB و {s['parse_saved']:.2f}s تحليل")
+        return lines
+
+
+_cache = None
+
+
+def get_cache() -> ValidatorCache:
+    global _cache
+    if _cache is None:
+        _cache = ValidatorCache()
+    return _cache
+
+
+def fetch_cached(source, url, parse_fn, *args, timeout=15):
+    """
+    النسخة المتزامنة من مسار المحرك: GET شرطي ثم بصمة المحتوى،
+    ولا نستدعي parse_fn(html, url, *args) إلا إذا تغيرت الصفحة
+    """
+    cache = get_cache()
+    resp = http_get(url, headers=cache.conditional_headers(url), timeout=timeout)
+    if resp.status_code == 304:
+        return cache.hit(source, url)
+    if resp.status_code != 200:
+        cache.miss(source)
+        return []
+    digest = body_hash(resp.text)
+    cached = cache.unchanged(source, url, digest)
+    if cached is not None:
+        return cached
+    started = time.perf_counter()
+    offers = parse_fn(resp.text, url, *args)
+    cache.store(source, url, resp, offers, time.perf_counter() - started, digest)
+    return offers
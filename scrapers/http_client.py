@@ -0,0 +1,72 @@
+"""
+عميل HTTP مشترك لكل السحّابات - اتصالات دائمة (keep-alive) بدل مصافحة TCP+TLS لكل طلب
+"""
+
+import itertools
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from config import HTTP_POOL_HOSTS, HTTP_POOL_PER_HOST
+
+
+# الترويسات الافتراضية (كانت منسوخة في كل سحّاب)
+# ACCEPT_ENCODING يتضمن br تلقائياً إذا كانت مكتبة brotli مثبتة
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept-Language': 'ar-SA,ar;q=0.9,en;q=0.8',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+_session = None
+_session_lock = threading.Lock()
+_request_counter = itertools.count(1)
+_request_count = 0
+
+
+def get_session() -> requests.Session:
+    """الجلسة المشتركة (تُنشأ مرة واحدة)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                # pool_block: عند امتلاء اتصالات الموقع ننتظر اتصالاً حراً بدل فتح اتصال جديد
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_PER_HOST, pool_block=True)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                session.headers.update(DEFAULT_HEADERS)
+                _session = session
+    return _session
+
+
+def get(url, headers=None, timeout=15, **kwargs) -> requests.Response:
+    """GET عبر الجلسة المشتركة - headers تُضاف فوق الترويسات الافتراضية"""
+    global _request_count
+    _request_count = next(_request_counter)
+    return get_session().get(url, headers=headers, timeout=timeout, **kwargs)
+
+
+def connection_stats() -> dict:
+    """عدد الطلبات والاتصالات الجديدة (المصافحات) منذ بدء التشغيل"""
+    connections = 0
+    if _session is not None:
+        for adapter in set(_session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+    return {'requests': _request_count, 'connections': connections}
+
+
+def close():
+    """إغلاق كل الاتصالات المفتوحة"""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
@@ -0,0 +1,70 @@
+"""
+الحالة المحفوظة في ملفات JSON بين التشغيلات (كاش HTTP، القواطع، الجدولة، الـ Feeds، فهرس المتاجر، بصمات البطاقات):
+تُقرأ عند أول استخدام لا عند الاستيراد، وتُحفظ بملف .tmp ثم os.replace حتى لا يبقى ملف نصف مكتوب إذا توقف البرنامج
+"""
+
+import json
+import os
+import threading
+
+
+def read_json(path, label, default=None):
+    """محتوى الملف، أو default ({}) إذا لم يوجد أو تعذرت قراءته"""
+    if os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ تعذر قراءة {label}: {e}")
+    return {} if default is None else default
+
+
+def write_json(path, data, label):
+    """حفظ ذري - data نص JSON جاهز (مأخوذ تحت قفل المستدعي) أو كائن يُحول هنا"""
+    if not isinstance(data, str):
+        data = json.dumps(data, ensure_ascii=False)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"⚠️ تعذر حفظ {label}: {e}")
+
+
+class JsonState:
+    """
+    قاموس حالة في ملف JSON - الصنف الفرعي يحدد label (لرسائل الأخطاء) ويسمي data باسمه (pages = JsonState.data)
+    lock يحمي القاموس أثناء التحويل للحفظ (الأصناف التي تُعدل من أكثر من خيط تستخدمه أيضاً)
+    """
+
+    label = 'الحالة'
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self._data = None
+        self._load_lock = threading.Lock()
+
+    def load(self) -> dict:
+        """القاموس - يُقرأ من الملف عند أول استدعاء"""
+        if self._data is None:
+            with self._load_lock:
+                if self._data is None:
+                    data = read_json(self.path, self.label)
+                    self.loaded(data)
+                    self._data = data
+        return self._data
+
+    data = property(load)
+
+    def loaded(self, data):
+        """بعد قراءة الملف (لبناء فهارس مشتقة من الحالة)"""
+
+    def save(self):
+        # لم تُقرأ الحالة في هذه الجلسة: لا شيء تغير
+        if self._data is None:
+            return
+        with self.lock:
+            data = json.dumps(self._data, ensure_ascii=False)
+        write_json(self.path, data, self.label)
@@ -0,0 +1,61 @@
+"""
+التحقق من الكوبونات قبل عرضها (/عروض): نعيد فحص الكوبونات التي لها كود ولم تظهر في المواقع منذ COUPON_REVALIDATE_AFTER فقط
+الكود يجب أن يبقى موجوداً في صفحة المصدر، وكل صفحة تُجلب مرة واحدة مهما كان عدد كوبوناتها
+"""
+
+import re
+from datetime import datetime
+
+from config import COUPON_REVALIDATE_AFTER
+from .request_policy import get as http_get
+
+
+# كود الكوبون: كلمة واحدة بحروف لاتينية وأرقام (السعر "199 ريال" أو "خصم" ليسا كوداً)
+CODE_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{2,24}$')
+
+# ردود تعني أن الصفحة نفسها لم تعد موجودة
+GONE_STATUSES = (404, 410)
+
+
+def coupon_code(offer) -> str:
+    price = (offer.get('price') or '').strip()
+    return price if CODE_RE.match(price) else ""
+
+
+def needs_check(offer, now=None) -> bool:
+    """كوبون بكود لم يظهر ولم نتحقق منه منذ COUPON_REVALIDATE_AFTER"""
+    if not coupon_code(offer):
+        return False
+    stamps = [offer[key] for key in ('checked_at', 'last_seen', 'first_seen') if offer.get(key)]
+    if not stamps:
+        return True
+    return ((now or datetime.now()) - datetime.fromisoformat(max(stamps))).total_seconds() > COUPON_REVALIDATE_AFTER
+
+
+def revalidate(offers) -> list:
+    """
+    [(offer, alive)] بنفس الترتيب - alive: True الكود ما زال في الصفحة، False انتهى (الكود اختفى أو الصفحة 404)،
+    None لم نحتج للتحقق أو تعذر (خطأ مؤقت لا يُنهي الكوبون)
+    """
+    pages = {}
+    results = []
+    for offer in offers:
+        if not needs_check(offer):
+            results.append((offer, None))
+            continue
+        link = offer['link']
+        if link not in pages:
+            try:
+                resp = http_get(link, timeout=10)
+                pages[link] = resp.status_code, resp.text.lower() if resp.status_code == 200 else ''
+            except Exception as e:
+                print(f"  تعذر التحقق من {link}: {e}")
+                pages[link] = None, ''
+        status, text = pages[link]
+        if status == 200:
+            results.append((offer, coupon_code(offer).lower() in text))
+        elif status in GONE_STATUSES:
+            results.append((offer, False))
+        else:
+            results.append((offer, None))
+    return results
@@ -0,0 +1,199 @@
+"""
+كشف العروض المكررة بين المصادر (نفس كوبون نون من الموفر وكوبون سعودي وcoupon.ae بروابط مختلفة):
+بصمة SimHash من (المتجر/العنوان، الكود، نسبة الخصم) مع فهرس نطاقات يجد المرشحين بدون المرور على كل العروض
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from urllib.parse import unquote, urlsplit
+
+from config import NEAR_DUP_INDEX_SIZE, NEAR_DUP_MAX_DISTANCE
+from .arabic import fold_text, find_percent
+
+
+BITS = 64
+# 4 نطاقات × 16 بت: أي بصمتين بينهما 3 فروق أو أقل تتطابقان في نطاق واحد على الأقل
+BANDS = 4
+BAND_BITS = BITS // BANDS
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# أوزان الخصائص في البصمة
+STORE_WEIGHT = 4
+CODE_WEIGHT = 4
+DISCOUNT_WEIGHT = 2
+
+_CODE_RE = re.compile(r'^(?=.*[A-Za-z])[A-Za-z0-9_-]{3,24}$')
+_WORD_RE = re.compile(r'\w+')
+# صفحة المتجر في رابط العرض عند المواقع المجمعة: /ar/stores/noon/ ، /store/noon ، /coupons/noon
+_STORE_PATH_RE = re.compile(r'/(?:stores?|brands?|coupons?|merchants?)/([^/?#]+)', re.IGNORECASE)
+
+# كلمات تتكرر في كل العناوين ولا تميز العرض (بعد fold_text مثل العناوين)
+STOP_WORDS = {fold_text(word) for word in (
+    'كوبون', 'كود', 'خصم', 'عرض', 'عروض', 'تخفيض', 'تخفيضات', 'على', 'من', 'في', 'حتى', 'إلى', 'مع', 'فقط',
+    'coupon', 'code', 'promo', 'discount', 'off', 'deal', 'offer', 'on', 'the', 'for', 'up', 'to',
+)}
+
+
+def _hash64(feature) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8', 'ignore'), digest_size=8).digest(), 'little')
+
+
+def offer_code(offer) -> str:
+    """كود الكوبون إن كان حقل السعر كوداً فعلاً (وليس "خصم" أو "20%" أو سعراً)"""
+    value = str(offer.get('price') or '').strip()
+    return value.upper() if _CODE_RE.match(value) else ''
+
+
+def offer_store(offer) -> str:
+    """
+    المتجر الذي يخصه العرض: اسم صفحة المتجر في الرابط (نفسه في كل المواقع المجمعة)، وإلا المضيف والمسار
+    - وليس source لأنه الموقع المجمع لا المتجر
+    """
+    link = str(offer.get('link') or '')
+    match = _STORE_PATH_RE.search(link)
+    if match:
+        return unquote(match.group(1)).lower()
+    parts = urlsplit(link)
+    return f"{parts.netloc.lower().removeprefix('www.')}{parts.path.rstrip('/')}"
+
+
+def offer_features(offer) -> dict:
+    """خصائص العرض الموزونة: المتجر، كلمات العنوان وأزواجها، الكود، نسبة الخصم"""
+    features = {}
+    store = offer_store(offer)
+    if store:
+        features[f"store:{store}"] = STORE_WEIGHT
+    words = [word for word in _WORD_RE.findall(fold_text(str(offer.get('title') or ''))) if word not in STOP_WORDS]
+    for word in words:
+        features[f"w:{word}"] = 1
+    for first, second in zip(words, words[1:]):
+        features[f"b:{first} {second}"] = 1
+    code = offer_code(offer)
+    if code:
+        features[f"code:{code}"] = CODE_WEIGHT
+    percent = find_percent(f"{offer.get('title', '')} {offer.get('price', '')}")
+    if percent:
+        features[f"pct:{percent}"] = DISCOUNT_WEIGHT
+    return features
+
+
+def simhash(features) -> int:
+    totals = [0] * BITS
+    for feature, weight in features.items():
+        value = _hash64(feature)
+        for bit in range(BITS):
+            totals[bit] += weight if value >> bit & 1 else -weight
+    return sum(1 << bit for bit in range(BITS) if totals[bit] > 0)
+
+
+def _bands(value):
+    return [(band, value >> (band * BAND_BITS) & BAND_MASK) for band in range(BANDS)]
+
+
+class NearDuplicates:
+    """
+    فهرس العروض المنشورة في هذه الجلسة: العرض المكرر يكمل ما ينقص العرض الأول (المصدر الأساسي)
+    ولا يمر للحفظ والرسم والإرسال - مرحلة في خط المعالجة (pipeline.py)
+    """
+
+    def __init__(self, max_size=NEAR_DUP_INDEX_SIZE, max_distance=NEAR_DUP_MAX_DISTANCE):
+        self.max_size = max_size
+        self.max_distance = max_distance
+        self.entries = OrderedDict()   # رقم -> (البصمة, مفتاح الكود, المتجر, العرض الأساسي)
+        self.bands = {}                # (النطاق, قيمته) -> أرقام العروض
+        self.codes = {}                # المتجر + الكود + الخصم -> رقم العرض
+        self.next_id = 0
+        self.merged = 0
+        self.lock = threading.Lock()
+
+    def find(self, value, code_key, store):
+        """
+        رقم العرض الأساسي المطابق أو None - نفس المتجر والكود والخصم أولاً، ثم أقرب بصمة من مرشحي النطاقات
+        في نفس المتجر (الأكواد العامة مثل WELCOME تتكرر بين المتاجر)
+        """
+        entry_id = self.codes.get(code_key) if code_key else None
+        if entry_id is not None:
+            return entry_id
+        candidates = set()
+        for band in _bands(value):
+            candidates.update(self.bands.get(band, ()))
+        best, best_distance = None, self.max_distance + 1
+        for entry_id in candidates:
+            if self.entries[entry_id][2] != store:
+                continue
+            distance = bin(self.entries[entry_id][0] ^ value).count('1')
+            if distance < best_distance:
+                best, best_distance = entry_id, distance
+        return best
+
+    def _add(self, value, code_key, store, offer):
+        entry_id = self.next_id
+        self.next_id += 1
+        self.entries[entry_id] = (value, code_key, store, offer)
+        for band in _bands(value):
+            self.bands.setdefault(band, set()).add(entry_id)
+        if code_key:
+            self.codes[code_key] = entry_id
+        if len(self.entries) > self.max_size:
+            self._remove(next(iter(self.entries)))
+
+    def _remove(self, entry_id):
+        value, code_key, _, _ = self.entries.pop(entry_id)
+        for band in _bands(value):
+            ids = self.bands.get(band)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self.bands[band]
+        if code_key and self.codes.get(code_key) == entry_id:
+            del self.codes[code_key]
+
+    @staticmethod
+    def _merge(canonical, duplicate) -> dict:
+        """نكمل ما ينقص العرض الأساسي من المكرر (الصورة، الكود) - يرجع الحقول التي اكتملت لتحديث قاعدة البيانات"""
+        filled = {}
+        if not canonical.get('image_url') and duplicate.get('image_url'):
+            filled['image_url'] = duplicate['image_url']
+        if not offer_code(canonical) and offer_code(duplicate):
+            filled['price'] = duplicate['price']
+        canonical.update(filled)
+        return filled
+
+    def match(self, offer):
+        """(العرض الأساسي, الحقول التي أكملها المكرر) للعرض المكرر، و (None, {}) للعرض الجديد (يُضاف للفهرس)"""
+        features = offer_features(offer)
+        code = offer_code(offer)
+        words = {feature for feature in features if feature.startswith('w:') and not feature[2:].isdigit()}
+        # عنوان قصير بدون كود لا يكفي للحكم بالتكرار
+        if not code and len(words) < 3:
+            return None, {}
+        value = simhash(features)
+        store = offer_store(offer)
+        percent = next((feature for feature in features if feature.startswith('pct:')), '')
+        code_key = f"{store}|{code}|{percent}" if code else ''
+        with self.lock:
+            entry_id = self.find(value, code_key, store)
+            if entry_id is None:
+                self._add(value, code_key, store, offer)
+                return None, {}
+            self.entries.move_to_end(entry_id)
+            canonical = self.entries[entry_id][3]
+            self.merged += 1
+            return canonical, self._merge(canonical, offer)
+
+    def __call__(self, offer):
+        """العرض الجديد يُرجع كما هو، والمكرر يرجع None"""
+        canonical, _ = self.match(offer)
+        return offer if canonical is None else None
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bands.clear()
+            self.codes.clear()
+            self.merged = 0
+
+
+near_duplicates = NearDuplicates()
@@ -0,0 +1,54 @@
+"""
+تصفح الصفحات التالية لصفحات الكوبونات (اختياري لكل مصدر في config.PAGINATION):
+نسحب الصفحة التالية فقط إذا كانت في الصفحة الحالية بطاقة جديدة، وبحد أقصى max_pages لكل صفحة أساسية
+"""
+
+import threading
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from config import PAGINATION, CARD_CACHE_SIZE
+from .content_hash import offer_key
+
+
+def paging_for(source_key):
+    """إعدادات التصفح للمصدر أو None إذا لم يُفعّل"""
+    paging = PAGINATION.get(source_key)
+    if not paging or paging.get('max_pages', 1) <= 1:
+        return None
+    return paging
+
+
+def page_url(base_url, page, paging) -> str:
+    """رابط الصفحة رقم page: قالب {url}/{page} إن وُجد وإلا معامل في الرابط (page=2 افتراضياً)"""
+    if paging.get('template'):
+        return paging['template'].format(url=base_url.rstrip('/'), page=page)
+    parts = urlsplit(base_url)
+    query = [(key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True) if key != paging.get('param', 'page')]
+    query.append((paging.get('param', 'page'), str(page)))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))
+
+
+class KnownCards:
+    """بصمات العروض التي ظهرت في صفحات كل مصدر (في الذاكرة، بحد أقصى لكل مصدر)"""
+
+    def __init__(self, max_size=CARD_CACHE_SIZE):
+        self.max_size = max_size
+        self.sources = {}
+        self.lock = threading.Lock()
+
+    def has_new(self, source_key, offers) -> bool:
+        """هل في الصفحة عرض لم يظهر من قبل؟ ثم نضيف عروضها للمعروفة"""
+        keys = [offer_key(offer) for offer in offers]
+        with self.lock:
+            known = self.sources.setdefault(source_key, OrderedDict())
+            new = any(key not in known for key in keys)
+            for key in keys:
+                known[key] = True
+                known.move_to_end(key)
+            while len(known) > self.max_size:
+                known.popitem(last=False)
+        return new
+
+
+known_cards = KnownCards()
@@ -0,0 +1,64 @@
+"""
+مرحلة تحليل اختيارية في عمليات منفصلة (ProcessPool) حتى لا يحجز التحليل الـ GIL
+ولا يبطئ حلقة أحداث البوت - مع رجوع تلقائي للتحليل داخل العملية عند أي عطل
+"""
+
+import asyncio
+import atexit
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from config import PARSE_PROCESSES
+
+
+_pool = None
+_disabled = False
+
+
+def get_pool():
+    """مجمع العمليات (يُنشأ عند أول استخدام) أو None إذا كان معطلاً"""
+    global _pool, _disabled
+    if _disabled or PARSE_PROCESSES <= 0:
+        return None
+    if _pool is None:
+        try:
+            # spawn: آمن مع وجود خيوط الجلب (fork مع خيوط قد يعلق)
+            _pool = ProcessPoolExecutor(max_workers=PARSE_PROCESSES, mp_context=multiprocessing.get_context('spawn'))
+        except Exception as e:
+            print(f"⚠️ تعذر تشغيل عمليات التحليل، التحليل داخل العملية: {e}")
+            _disabled = True
+            return None
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+atexit.register(shutdown)
+
+
+def parse_bytes(parse_fn, content, encoding, url, label):
+    """يعمل داخل العملية الفرعية: بايتات HTML -> قائمة عروض (dicts عادية)"""
+    html = content.decode(encoding or 'utf-8', errors='replace')
+    return parse_fn(html, url, label)
+
+
+async def parse_page(run, parse_fn, resp, url, label):
+    """تحليل صفحة في مجمع العمليات إن كان مفعلاً، وإلا في خيوط ScrapeRun"""
+    global _disabled
+    pool = get_pool()
+    if pool is not None:
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(pool, parse_bytes, parse_fn, resp.content, resp.encoding, url, label)
+        except BrokenProcessPool as e:
+            if not _disabled:
+                print(f"⚠️ توقف مجمع عمليات التحليل، الرجوع للتحليل داخل العملية: {e}")
+                _disabled = True
+                shutdown()
+    return await run.run_blocking(parse_fn, resp.text, url, label)
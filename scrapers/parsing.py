@@ -0,0 +1,94 @@
+"""
+اختيار محلل HTML (lxml أسرع بكثير من html.parser) والتحليل الجزئي:
+نبني فقط عناصر البطاقات بدل شجرة الصفحة كاملة
+"""
+
+import re
+from functools import lru_cache
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from config import HTML_PARSER
+
+
+def _detect_parser():
+    if HTML_PARSER != 'auto':
+        return HTML_PARSER
+    try:
+        import lxml  # noqa: F401
+        return 'lxml'
+    except ImportError:
+        return 'html.parser'
+
+
+PARSER = _detect_parser()
+
+# أجزاء المحددات البسيطة التي نستطيع تحويلها لمرشح أثناء التحليل:
+# tag | .class | tag.class | [class*="x"] | tag[class*="x"]
+_SIMPLE_PART_RE = re.compile(r'^([a-z][a-z0-9]*)?(?:\.([\w-]+)|\[class\*=["\']([^"\']+)["\']\])?$', re.I)
+
+
+class CardStrainer(SoupStrainer):
+    """
+    مرشح يحتفظ فقط بالعناصر التي قد تطابق محدد البطاقات (وكل ما بداخلها)
+    المطابقة أوسع من المحدد نفسه (بدون حساسية لحالة الأحرف) لذلك select بعدها يعطي نفس النتيجة
+    """
+
+    def __init__(self, rules):
+        # قاعدة اسم شكلية حتى لا يعتبر bs4 المرشح فارغاً
+        super().__init__(name=lambda name: True)
+        self.rules = rules
+
+    def matches(self, name, attrs):
+        classes = (attrs or {}).get('class') or ''
+        if isinstance(classes, (list, tuple)):
+            classes = ' '.join(classes)
+        classes = classes.lower()
+        class_tokens = classes.split()
+        for tag, exact_class, class_part in self.rules:
+            if tag and tag != name:
+                continue
+            if exact_class and exact_class not in class_tokens:
+                continue
+            if class_part and class_part not in classes:
+                continue
+            return True
+        return False
+
+    # bs4 >= 4.13
+    def allow_tag_creation(self, nsprefix, name, attrs):
+        return self.matches(name, attrs)
+
+    # bs4 4.12
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        if isinstance(markup_name, str):
+            return markup_name if self.matches(markup_name, markup_attrs) else None
+        return super().search_tag(markup_name, markup_attrs)
+
+
+@lru_cache(maxsize=128)
+def strainer_for(selector):
+    """مرشح تحليل جزئي لمحدد CSS، أو None إذا كان المحدد معقداً (نحلل الصفحة كاملة)"""
+    if not selector:
+        return None
+    rules = []
+    for part in selector.split(','):
+        match = _SIMPLE_PART_RE.match(part.strip())
+        if not match or not any(match.groups()):
+            return None
+        tag, exact_class, class_part = match.groups()
+        rules.append((
+            tag.lower() if tag else None,
+            exact_class.lower() if exact_class else None,
+            class_part.lower() if class_part else None,
+        ))
+    return CardStrainer(tuple(rules))
+
+
+def make_soup(html, only=None):
+    """
+    تحليل HTML بالمحلل المختار
+    only: محدد CSS للبطاقات - إذا كان بسيطاً لا نبني إلا العناصر المطابقة له
+    """
+    strainer = strainer_for(only) if only else None
+    return BeautifulSoup(html, PARSER, parse_only=strainer)
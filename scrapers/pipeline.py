@@ -0,0 +1,101 @@
+"""
+خط معالجة العروض تدفقياً: جلب وتحليل (engine.stream_offers) ← تطبيع ← إزالة التكرار ← حفظ ← نشر
+(إزالة التكرار: نفس العرض في الدورة، ثم العروض المعروفة (الرابط والكود) في seen_filter قبل قاعدة البيانات،
+ثم نفس العرض من مصدر آخر برابط مختلف في near_duplicates)
+كل مرحلة مهمة مستقلة وبينها طوابير محدودة، فعرض أسرع موقع يصل للقناة قبل أن ينتهي أبطأ موقع
+"""
+
+import asyncio
+import inspect
+from urllib.parse import urlsplit
+
+from config import PIPELINE_QUEUE_SIZE
+from .canonical import clean_url
+from .content_hash import card_cache, offer_key
+from .lifecycle import coupon_code
+from .seen_filter import seen_links
+
+
+def normalize_offer(offer):
+    """
+    توحيد حقول العرض والرابط قبل الحفظ - يرجع None للعرض بدون عنوان أو رابط كامل
+    (المحللات تكمل الروابط النسبية برابط صفحتها، فالرابط النسبي هنا لا يُفتح ولا يميز موقعه عن غيره)
+    code: كود الكوبون إن وُجد - مع الرابط هوية العرض في قاعدة البيانات
+    """
+    title = ' '.join(str(offer.get('title') or '').split())[:100]
+    link = clean_url(str(offer.get('link') or ''))
+    if not title or not urlsplit(link).netloc:
+        return None
+    offer['title'] = title
+    offer['link'] = link
+    offer['category'] = offer.get('category') or 'عروض متنوعة'
+    for field in ('price', 'source', 'image_url', 'description'):
+        offer[field] = offer.get(field) or ''
+    offer['code'] = coupon_code(offer)
+    return offer
+
+
+def skip_known(offer):
+    """إسقاط العرض إذا كان (رابطه, كوده) في قاعدة البيانات مسبقاً - بدون أي I/O"""
+    return None if seen_links.seen(offer['link'], offer['code']) else offer
+
+
+class Deduper:
+    """إزالة التكرار داخل الدورة، وتخطي بطاقات لم تتغير وحُفظت في هذه الجلسة"""
+
+    def __init__(self):
+        self.seen = set()
+
+    def __call__(self, offer):
+        key = offer_key(offer)
+        if key in self.seen or card_cache.is_saved(offer):
+            return None
+        self.seen.add(key)
+        return offer
+
+
+async def _stage(name, fn, inbox, outbox):
+    """تطبق fn على كل عنصر من inbox وترسل الناتج (غير None) إلى outbox - None في الطابور يعني النهاية"""
+    while True:
+        item = await inbox.get()
+        if item is None:
+            break
+        try:
+            result = fn(item)
+            if inspect.isawaitable(result):
+                result = await result
+        except Exception as e:
+            print(f"⚠️ خطأ في مرحلة {name}: {e}")
+            continue
+        if result is not None:
+            await outbox.put(result)
+    await outbox.put(None)
+
+
+async def run_pipeline(offers, stages, queue_size=PIPELINE_QUEUE_SIZE) -> int:
+    """
+    offers: مولد غير متزامن للعروض (مثل stream_offers)
+    stages: [(اسم, دالة)] - الدالة (عادية أو async) ترجع العرض للمرحلة التالية أو None لإسقاطه
+    يرجع عدد العروض التي مرت من كل المراحل
+    """
+    queues = [asyncio.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    workers = [
+        asyncio.create_task(_stage(name, fn, queues[index], queues[index + 1]))
+        for index, (name, fn) in enumerate(stages)
+    ]
+
+    async def drain():
+        count = 0
+        while await queues[-1].get() is not None:
+            count += 1
+        return count
+
+    drainer = asyncio.create_task(drain())
+    try:
+        async for offer in offers:
+            await queues[0].put(offer)
+        await queues[0].put(None)
+        return await drainer
+    finally:
+        for task in workers + [drainer]:
+            task.cancel()
@@ -0,0 +1,168 @@
+"""
+تحديد معدل الطلبات لكل موقع (Token Bucket) مع تحكم تكيفي في التوازي:
+نرفع التوازي ما دامت الاستجابة سريعة، ونخفضه مع 429/503 أو بطء الاستجابة، ونحترم Retry-After
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+from config import RATE_LIMITS
+
+
+THROTTLE_STATUSES = (429, 503)
+
+# انتظار افتراضي بعد 429/503 بدون Retry-After، وأقصى انتظار نقبله من الموقع
+DEFAULT_BACKOFF = 30.0
+MAX_RETRY_AFTER = 600.0
+
+
+def host_key(url) -> str:
+    host = urlsplit(url).netloc.lower().split(':')[0]
+    return host[4:] if host.startswith('www.') else host
+
+
+def _host_settings(host) -> dict:
+    settings = dict(RATE_LIMITS['default'])
+    for domain, overrides in RATE_LIMITS.items():
+        if domain != 'default' and (host == domain or host.endswith('.' + domain)):
+            settings.update(overrides)
+    return settings
+
+
+def parse_retry_after(value):
+    """Retry-After بالثواني أو كتاريخ HTTP - يرجع عدد الثواني أو None"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+class HostLimiter:
+    """Token Bucket + حد توازي تكيفي (AIMD) لموقع واحد"""
+
+    def __init__(self, host, rate, burst, min_concurrency, max_concurrency, target_latency):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.tokens = float(burst)
+        self.refilled_at = time.monotonic()
+        # نبدأ من منتصف المدى ونتكيف بعدها
+        self.concurrency = max(float(min_concurrency), max_concurrency / 2)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.latency = None
+        self.throttled = 0
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.refilled_at) * self.rate)
+        self.refilled_at = now
+
+    def try_acquire(self):
+        """يأخذ مكاناً إن أمكن ويرجع 0، وإلا يرجع كم ثانية ننتظر قبل المحاولة"""
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.in_flight >= int(self.concurrency):
+            return 0.05
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.in_flight += 1
+        return 0
+
+    def release(self, status, latency, retry_after=None):
+        self.in_flight -= 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+        
+        if status in THROTTLE_STATUSES:
+            # الموقع يطلب التمهل: نصف التوازي وننتظر المدة المطلوبة
+            self.throttled += 1
+            self.concurrency = max(self.min_concurrency, self.concurrency / 2)
+            wait = retry_after if retry_after is not None else DEFAULT_BACKOFF
+            self.blocked_until = max(self.blocked_until, time.monotonic() + wait)
+        elif status is None or (self.latency is not None and self.latency > self.target_latency):
+            # فشل أو بطء متزايد
+            self.concurrency = max(self.min_concurrency, self.concurrency * 0.75)
+        else:
+            # زيادة تدريجية (+1 تقريباً لكل "نافذة" كاملة من الطلبات الناجحة)
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def state(self) -> dict:
+        now = time.monotonic()
+        return {
+            'host': self.host,
+            'concurrency': round(self.concurrency, 2),
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'rate': self.rate,
+            'tokens': round(min(self.burst, self.tokens + (now - self.refilled_at) * self.rate), 2),
+            'latency': round(self.latency, 2) if self.latency is not None else None,
+            'blocked_for': round(max(0.0, self.blocked_until - now), 1),
+            'throttled': self.throttled,
+        }
+
+
+class Ticket:
+    """نتيجة الطلب تُسجل هنا ليتعلم منها المحدد"""
+
+    def __init__(self):
+        self.status = None
+        self.retry_after = None
+
+    def record(self, resp):
+        self.status = resp.status_code
+        if resp.status_code in THROTTLE_STATUSES:
+            self.retry_after = parse_retry_after(resp.headers.get('Retry-After'))
+
+
+class RateLimiter:
+    """محددات كل المواقع - تبقى بين الدورات حتى يحتفظ كل موقع بما تعلمه"""
+
+    def __init__(self):
+        self.hosts = {}
+
+    def for_url(self, url) -> HostLimiter:
+        host = host_key(url)
+        limiter = self.hosts.get(host)
+        if limiter is None:
+            limiter = HostLimiter(host, **_host_settings(host))
+            self.hosts[host] = limiter
+        return limiter
+
+    @asynccontextmanager
+    async def request(self, url):
+        limiter = self.for_url(url)
+        while True:
+            wait = limiter.try_acquire()
+            if not wait:
+                break
+            await asyncio.sleep(wait)
+        
+        ticket = Ticket()
+        started = time.monotonic()
+        try:
+            yield ticket
+        finally:
+            latency = time.monotonic() - started if ticket.status is not None else None
+            limiter.release(ticket.status, latency, ticket.retry_after)
+
+    def state(self) -> list:
+        return [limiter.state() for limiter in self.hosts.values()]
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,121 @@
+"""
+سياسة الطلبات لكل موقع (config.REQUEST_POLICY): مهلة اتصال منفصلة عن مهلة القراءة،
+إعادة محاولة طلبات GET مع انتظار أسي عشوائي (full jitter)،
+وطلب تحوطي (hedged) إذا تأخر الرد أكثر من نسبة مئوية من أزمنة الموقع الأخيرة - بميزانية محدودة حتى لا يزيد الحمل
+"""
+
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+
+from config import REQUEST_POLICY
+from .http_client import get as http_get
+from .rate_limit import host_key
+
+
+# أخطاء مؤقتة نعيد المحاولة عندها (429/503 يتولاها rate_limiter مع Retry-After، فلا نعيدها فوراً)
+RETRY_STATUSES = (500, 502, 504)
+RETRY_ERRORS = (requests.ConnectionError, requests.Timeout)
+
+
+def policy_for(url) -> dict:
+    """إعدادات الموقع: default ثم ما يخص الدومين"""
+    host = host_key(url)
+    policy = dict(REQUEST_POLICY['default'])
+    for domain, overrides in REQUEST_POLICY.items():
+        if domain != 'default' and (host == domain or host.endswith('.' + domain)):
+            policy.update(overrides)
+    return policy
+
+
+def split_timeout(policy, timeout) -> tuple:
+    """(مهلة الاتصال, مهلة القراءة) - timeout المصدر يصبح مهلة القراءة"""
+    return min(policy['connect_timeout'], timeout), timeout
+
+
+def backoff_delay(attempt, policy) -> float:
+    """انتظار قبل المحاولة رقم attempt+1: عشوائي بين 0 و backoff * 2^attempt (بحد max_backoff)"""
+    return random.uniform(0, min(policy['max_backoff'], policy['backoff'] * 2 ** attempt))
+
+
+def should_retry(resp) -> bool:
+    return resp.status_code in RETRY_STATUSES
+
+
+class LatencyTracker:
+    """أزمنة الردود الأخيرة لكل موقع وعدد الطلبات/إعادات المحاولة/الطلبات التحوطية"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self.hosts = {}
+        self.lock = threading.Lock()
+
+    def _host(self, url):
+        host = host_key(url)
+        state = self.hosts.get(host)
+        if state is None:
+            state = self.hosts[host] = {'latencies': deque(maxlen=self.window), 'requests': 0, 'retries': 0, 'hedges': 0, 'hedge_wins': 0}
+        return state
+
+    def record(self, url, latency):
+        with self.lock:
+            state = self._host(url)
+            state['requests'] += 1
+            if latency is not None:
+                state['latencies'].append(latency)
+
+    def count(self, url, field):
+        with self.lock:
+            self._host(url)[field] += 1
+
+    def hedge_delay(self, url, policy):
+        """بعد كم ثانية نرسل طلباً تحوطياً، أو None (غير مفعّل / عينات قليلة / الميزانية نفدت)"""
+        if not policy.get('hedge_percentile'):
+            return None
+        with self.lock:
+            state = self._host(url)
+            samples = sorted(state['latencies'])
+            if len(samples) < policy['hedge_min_samples']:
+                return None
+            if state['hedges'] >= policy['hedge_budget'] * state['requests']:
+                return None
+            return samples[min(int(len(samples) * policy['hedge_percentile']), len(samples) - 1)]
+
+    def report(self) -> list:
+        with self.lock:
+            return [
+                f"{host}: {state['requests']} طلب | إعادة {state['retries']} | تحوط {state['hedges']} (أسرع {state['hedge_wins']})"
+                for host, state in sorted(self.hosts.items()) if state['retries'] or state['hedges']
+            ]
+
+
+latency_tracker = LatencyTracker()
+
+
+def get(url, headers=None, timeout=15, **kwargs) -> requests.Response:
+    """
+    GET متزامن بسياسة الموقع (للسحّابات القديمة و الـ Feeds): مهلتان منفصلتان وإعادة محاولة للأخطاء المؤقتة
+    بدون طلبات تحوطية (تحتاج محرك السحب غير المتزامن)
+    """
+    policy = policy_for(url)
+    timeouts = split_timeout(policy, timeout)
+    attempt = 0
+    while True:
+        started = time.monotonic()
+        try:
+            resp = http_get(url, headers=headers, timeout=timeouts, **kwargs)
+        except RETRY_ERRORS:
+            latency_tracker.record(url, None)
+            if attempt >= policy['retries']:
+                raise
+        else:
+            latency_tracker.record(url, time.monotonic() - started)
+            if attempt >= policy['retries'] or not should_retry(resp):
+                return resp
+            resp.close()
+        latency_tracker.count(url, 'retries')
+        time.sleep(backoff_delay(attempt, policy))
+        attempt += 1
@@ -1,127 +1,90 @@
-import requests
 from datetime import datetime
-from bs4 import BeautifulSoup
+from urllib.parse import urljoin
 import re
 import json
 
+from config import SITEMAPS
+from .arabic import normalize_text
+from .content_hash import card_cache
+from .coupon_fields import extract_fields
+from .feeds import read_feed
+from .request_policy import get as http_get
+from .parsing import make_soup
+from .sitemap import store_index
+
 
 def clean_text(text):
     if not text:
         return ""
-    text = re.sub(r'<[^>]+>', '', str(text))
-    text = ' '.join(text.split())
+    text = normalize_text(re.sub(r'<[^>]+>', '', str(text)))
     return text[:200]
 
 
-def fetch_all_rss_feeds(feeds: list):
-    """سحب كل العروض الحقيقية"""
-    all_offers = []
-    
-    print("=" * 50)
-    print("🚀 سحب الكوبونات الحقيقية...")
-    print("=" * 50)
-    
-    # 1. كوبونات الموفر
-    try:
-        offers = scrape_almowafir()
-        all_offers.extend(offers)
-        print(f"✅ الموفر: {len(offers)}")
-    except Exception as e:
-        print(f"❌ الموفر: {e}")
-    
-    # 2. كوبون سعودي
-    try:
-        offers = scrape_couponsaudi()
-        all_offers.extend(offers)
-        print(f"✅ كوبون سعودي: {len(offers)}")
-    except Exception as e:
-        print(f"❌ كوبون سعودي: {e}")
-    
-    # 3. كوبون عربي
-    try:
-        offers = scrape_couponarabi()
-        all_offers.extend(offers)
-        print(f"✅ كوبون عربي: {len(offers)}")
-    except Exception as e:
-        print(f"❌ كوبون عربي: {e}")
-    
-    print("=" * 50)
-    print(f"✅ إجمالي: {len(all_offers)}")
-    
-    return all_offers
+def clean_title(title: str) -> str:
+    if not title:
+        return ""
+    title = re.sub(r'<[^>]+>', '', title)
+    title = title.replace('*', '').replace('_', '').replace('[', '').replace(']', '')
+    title = normalize_text(title)
+    return title[:100] if title else ""
 
 
-def scrape_almowafir():
-    """سحب كوبونات حقيقية من الموفر"""
-    offers = []
-    
-    # صفحات المتاجر المشهورة
-    stores = [
-        ("noon", "نون"),
-        ("amazon-sa", "أمازون"),
-        ("shein", "شي إن"),
-        ("namshi", "نمشي"),
-        ("hungerstation", "هنقرستيشن"),
-        ("jahez", "جاهز"),
-        ("talabat", "طلبات"),
-        ("aliexpress", "علي اكسبرس"),
-    ]
+def fetch_all_rss_feeds(feeds: list, replay=False):
+    """سحب كل العروض الحقيقية (نسخة متزامنة فوق المحرك غير المتزامن) - replay: من النسخ المحفوظة فقط"""
+    import asyncio
+    from .engine import fetch_all_offers
+    return asyncio.run(fetch_all_offers(feeds=feeds, force=True, replay=replay))
+
+
+# ============== الموفر ==============
+
+# صفحات المتاجر المشهورة
+ALMOWAFIR_STORES = [
+    ("noon", "نون"),
+    ("amazon-sa", "أمازون"),
+    ("shein", "شي إن"),
+    ("namshi", "نمشي"),
+    ("hungerstation", "هنقرستيشن"),
+    ("jahez", "جاهز"),
+    ("talabat", "طلبات"),
+    ("aliexpress", "علي اكسبرس"),
+]
+
+
+# مرشح التحليل الجزئي لبطاقات الموفر (أوسع قليلاً من فلتر find_all)
+ALMOWAFIR_CARDS = 'div[class*="coupon"], div[class*="offer"], section[class*="coupon"], section[class*="offer"]'
+
+# الحد الأقصى لكوبونات كل صفحة متجر بدون تصفح (page_limit في المحرك - مع التصفح تُقرأ الصفحة كاملة)
+ALMOWAFIR_PAGE_LIMIT = 3
+
+
+def almowafir_pages():
+    """روابط صفحات متاجر الموفر مع اسم كل متجر: الثابتة ثم المكتشفة من الـ sitemap (باسم الـ slug)"""
+    pages = [(f"https://almowafir.com/ar/stores/{slug}/", name) for slug, name in ALMOWAFIR_STORES]
+    known = {url for url, _ in pages}
+    discovered = store_index.stores('almowafir', SITEMAPS.get('almowafir', {}).get('max_stores'))
+    return pages + [(url, slug) for url, slug in discovered if url not in known]
+
+
+def _almowafir_coupon_offer(coupon, url, name):
+    """استخراج عرض واحد من بطاقة كوبون في الموفر - يرجع None إذا لم يوجد كود أو وصف"""
+    # الكود (data-code / عنصر code / input) والوصف ونسبة الخصم في مرور واحد
+    fields = extract_fields(coupon, 'الموفر')
+    code = fields.code
+    desc = fields.summary
+    discount = fields.discount or "خصم"
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0.0.0',
-        'Accept-Language': 'ar-SA,ar;q=0.9',
-        'Accept': 'text/html,application/xhtml+xml'
-    }
+    if not (code or desc):
+        return None
     
-    for slug, name in stores:
-        try:
-            url = f"https://almowafir.com/ar/stores/{slug}/"
-            resp = requests.get(url, headers=headers, timeout=15)
-            
-            if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                
-                # البحث عن الكوبونات
-                # الموفر يستخدم data attributes للكودات
-                coupons = soup.find_all(['div', 'section'], class_=lambda x: x and ('coupon' in x.lower() or 'offer' in x.lower()))
-                
-                for coupon in coupons[:3]:
-                    # محاولة استخراج الكود
-                    code = None
-                    
-                    # 1. من data attribute
-                    code = coupon.get('data-code') or coupon.get('data-coupon')
-                    
-                    # 2. من عنصر داخلي
-                    if not code:
-                        code_el = coupon.find(class_=lambda x: x and 'code' in x.lower())
-                        if code_el:
-                            code = code_el.get_text(strip=True)
-                    
-                    # 3. من input
-                    if not code:
-                        code_input = coupon.find('input', {'type': 'text'})
-                        if code_input:
-                            code = code_input.get('value')
-                    
-                    # استخراج الوصف
-                    desc_el = coupon.find(['h3', 'h4', 'p', 'span'], class_=lambda x: x and ('title' in str(x).lower() or 'desc' in str(x).lower()))
-                    desc = desc_el.get_text(strip=True) if desc_el else ""
-                    
-                    # استخراج نسبة الخصم
-                    text = coupon.get_text()
-                    percent = re.search(r'(\d+)\s*%', text)
-                    discount = f"{percent.group(1)}%" if percent else "خصم"
-                    
-                    if code or desc:
-                        offers.append({
-                            'title': f"كوبون {name}: {clean_text(desc)[:50]}" if desc else f"كوبون {name}",
-                            'link': url,
-                            'price': code if code else discount,
-                            'category': 'كوبونات',
-                            'source': name,
-                            'image_url': '',
-                            'description': f"""🎫 *كوبون {name}*
+    return {
+        'title': f"كوبون {name}: {clean_text(desc)[:50]}" if desc else f"كوبون {name}",
+        'link': url,
+        'price': code if code else discount,
+        'category': 'كوبونات',
+        'source': name,
+        'image_url': '',
+        'description': f"""🎫 *كوبون {name}*
 
 💰 الكود: *{code if code else 'اضغط للحصول على الكود'}*
 📊 الخصم: {discount}
@@ -132,8 +95,39 @@ def scrape_almowafir():
 3. الصق الكود عند الدفع
 
 🔗 رابط الموقع: {url}""",
-                            'date': datetime.now().isoformat()
-                        })
+        'expires_at': fields.expires,
+        'date': datetime.now().isoformat()
+    }
+
+
+def parse_almowafir_store(html, url, name):
+    """استخراج كل كوبونات صفحة متجر واحدة في الموفر (الحد لكل صفحة يطبقه المستدعي)"""
+    offers = []
+    soup = make_soup(html, only=ALMOWAFIR_CARDS)
+    
+    # البحث عن الكوبونات
+    # الموفر يستخدم data attributes للكودات
+    coupons = soup.find_all(['div', 'section'], class_=lambda x: x and ('coupon' in x.lower() or 'offer' in x.lower()))
+    
+    for coupon in coupons:
+        # البطاقات غير المتغيرة تؤخذ من الكاش بدون إعادة استخراج
+        offer = card_cache.extract(coupon, _almowafir_coupon_offer, url, name)
+        if offer:
+            offers.append(offer)
+    
+    return offers
+
+
+def scrape_almowafir():
+    """سحب كوبونات حقيقية من الموفر"""
+    offers = []
+    
+    for url, name in almowafir_pages():
+        try:
+            resp = http_get(url, timeout=15)
+            
+            if resp.status_code == 200:
+                offers.extend(parse_almowafir_store(resp.text, url, name)[:ALMOWAFIR_PAGE_LIMIT])
                         
         except Exception as e:
             print(f"  خطأ {name}: {e}")
@@ -142,119 +136,147 @@ def scrape_almowafir():
     return offers
 
 
+# ============== كوبون سعودي ==============
+
+COUPONSAUDI_URL = "https://www.couponsaudi.com/"
+COUPONSAUDI_CARDS = ', '.join(f'{tag}[class*="{key}"]' for tag in ('div', 'article') for key in ('coupon', 'deal', 'offer', 'card'))
+
+
+def couponsaudi_pages():
+    return [(COUPONSAUDI_URL, 'كوبون سعودي')]
+
+
+def parse_couponsaudi(html, url, name=None):
+    """استخراج بطاقات الكوبونات من الصفحة الرئيسية لكوبون سعودي"""
+    offers = []
+    soup = make_soup(html, only=COUPONSAUDI_CARDS)
+    
+    # البحث عن بطاقات الكوبونات
+    cards = soup.find_all(['div', 'article'], class_=lambda x: x and any(k in str(x).lower() for k in ['coupon', 'deal', 'offer', 'card']))
+    
+    for card in cards[:10]:
+        fields = extract_fields(card, 'كوبون سعودي')
+        code = fields.code
+        
+        if fields.heading:
+            title_text = clean_text(fields.heading)
+            offers.append({
+                'title': title_text,
+                'link': urljoin(url, fields.link) if fields.link else url,
+                'price': code if code else (fields.discount or "خصم"),
+                'category': 'كوبونات',
+                'source': 'كوبون سعودي',
+                'image_url': '',
+                'description': f"🎫 {title_text}\n\n{'📋 الكود: ' + code if code else ''}\n\n✅ كوبون فعال من كوبون سعودي",
+                'expires_at': fields.expires,
+                'date': datetime.now().isoformat()
+            })
+    
+    return offers
+
+
 def scrape_couponsaudi():
     """سحب من موقع كوبون سعودي"""
     offers = []
     
     try:
-        url = "https://www.couponsaudi.com/"
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        resp = requests.get(url, headers=headers, timeout=15)
+        resp = http_get(COUPONSAUDI_URL, timeout=15)
         
         if resp.status_code == 200:
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            
-            # البحث عن بطاقات الكوبونات
-            cards = soup.find_all(['div', 'article'], class_=lambda x: x and any(k in str(x).lower() for k in ['coupon', 'deal', 'offer', 'card']))
-            
-            for card in cards[:10]:
-                title = card.find(['h2', 'h3', 'h4'])
-                link = card.find('a')
-                
-                # البحث عن الكود
-                code_el = card.find(class_=lambda x: x and 'code' in str(x).lower())
-                code = code_el.get_text(strip=True) if code_el else None
-                
-                # البحث عن الخصم
-                text = card.get_text()
-                percent = re.search(r'(\d+)\s*%', text)
-                
-                if title:
-                    title_text = clean_text(title.get_text())
-                    offers.append({
-                        'title': title_text,
-                        'link': link.get('href', url) if link else url,
-                        'price': code if code else (f"{percent.group(1)}%" if percent else "خصم"),
-                        'category': 'كوبونات',
-                        'source': 'كوبون سعودي',
-                        'image_url': '',
-                        'description': f"🎫 {title_text}\n\n{'📋 الكود: ' + code if code else ''}\n\n✅ كوبون فعال من كوبون سعودي",
-                        'date': datetime.now().isoformat()
-                    })
+            offers = parse_couponsaudi(resp.text, COUPONSAUDI_URL)
     except Exception as e:
         print(f"خطأ كوبون سعودي: {e}")
     
     return offers
 
 
-def scrape_couponarabi():
-    """سحب من مواقع الكوبونات العربية"""
+# ============== كوبون عربي ==============
+
+COUPONARABI_SITES = [
+    "https://www.coupon.ae/ar/",
+    "https://www.alcoupon.com/ar/",
+]
+
+# الحد الأقصى لعروض كوبون عربي في الدورة الواحدة
+COUPONARABI_LIMIT = 5
+
+
+def couponarabi_pages():
+    return [(site_url, 'كوبون عربي') for site_url in COUPONARABI_SITES]
+
+
+def parse_couponarabi(html, site_url, name=None):
+    """استخراج البطاقات ذات الصلة من موقع كوبونات عربي"""
     offers = []
+    soup = make_soup(html, only='div, article')
+    
+    # البطاقات
+    cards = soup.find_all(['div', 'article'], limit=20)
     
-    sites = [
-        "https://www.coupon.ae/ar/",
-        "https://www.alcoupon.com/ar/",
-    ]
+    for card in cards:
+        fields = extract_fields(card, 'كوبون عربي')
+        # فلترة البطاقات ذات الصلة
+        text = fields.text.lower()
+        if not any(k in text for k in ['خصم', 'كوبون', 'كود', '%', 'offer', 'discount']):
+            continue
+        
+        title = fields.heading
+        if not title and card.a:
+            title = card.a.get_text()
+        title_text = clean_text(title)
+        if len(title_text) < 5:
+            continue
+        
+        code = fields.code
+        
+        offers.append({
+            'title': title_text[:60],
+            # روابط البطاقات نسبية غالباً (/ar/store/...) فنكملها برابط الموقع نفسه
+            'link': urljoin(site_url, fields.link) if fields.link else site_url,
+            'price': code if code else (fields.discount or "خصم"),
+            'category': 'كوبونات',
+            'source': 'كوبون عربي',
+            'image_url': '',
+            'description': f"🎫 {title_text}\n\n✅ كوبون فعال",
+            'expires_at': fields.expires,
+            'date': datetime.now().isoformat()
+        })
+        
+        if len(offers) >= COUPONARABI_LIMIT:
+            break
     
-    headers = {'User-Agent': 'Mozilla/5.0', 'Accept-Language': 'ar'}
+    return offers
+
+
+def scrape_couponarabi():
+    """سحب من مواقع الكوبونات العربية"""
+    offers = []
     
-    for site_url in sites:
+    for site_url, _ in couponarabi_pages():
         try:
-            resp = requests.get(site_url, headers=headers, timeout=15)
+            resp = http_get(site_url, timeout=15)
             if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, 'html.parser')
-                
-                # البطاقات
-                cards = soup.find_all(['div', 'article'], limit=20)
-                
-                for card in cards:
-                    # فلترة البطاقات ذات الصلة
-                    text = card.get_text().lower()
-                    if not any(k in text for k in ['خصم', 'كوبون', 'كود', '%', 'offer', 'discount']):
-                        continue
-                    
-                    title = card.find(['h2', 'h3', 'h4', 'a'])
-                    if not title:
-                        continue
-                        
-                    title_text = clean_text(title.get_text())
-                    if len(title_text) < 5:
-                        continue
-                    
-                    # الخصم
-                    percent = re.search(r'(\d+)\s*%', card.get_text())
-                    
-                    # الكود
-                    code = None
-                    code_el = card.find(attrs={'data-clipboard-text': True})
-                    if code_el:
-                        code = code_el.get('data-clipboard-text')
-                    
-                    link = card.find('a')
-                    
-                    offers.append({
-                        'title': title_text[:60],
-                        'link': link.get('href', site_url) if link else site_url,
-                        'price': code if code else (f"{percent.group(1)}%" if percent else "خصم"),
-                        'category': 'كوبونات',
-                        'source': 'كوبون عربي',
-                        'image_url': '',
-                        'description': f"🎫 {title_text}\n\n✅ كوبون فعال",
-                        'date': datetime.now().isoformat()
-                    })
-                    
-                    if len(offers) >= 5:
-                        break
+                offers.extend(parse_couponarabi(resp.text, site_url))
+                if len(offers) >= COUPONARABI_LIMIT:
+                    break
                         
         except Exception as e:
             print(f"خطأ {site_url}: {e}")
             continue
     
-    return offers
+    return offers[:COUPONARABI_LIMIT]
 
 
 def fetch_rss_offers(feed_url: str, feed_name: str, category: str):
-    return []
+    """سحب العناصر الجديدة من RSS/Atom (قراءة تدفقية تتوقف عند آخر عنصر شوهد)"""
+    try:
+        return read_feed(feed_url, feed_name, category)
+    except Exception as e:
+        print(f"خطأ {feed_name}: {e}")
+        return []
 
 def fetch_webpage_offers(url: str, selectors: dict):
-    return []
+    """سحب صفحة واحدة بمواصفة CSS (نفس صيغة config.WEBPAGE_SOURCES أو المحددات فقط)"""
+    from .selector_engine import scrape_site
+    spec = selectors if 'selectors' in selectors else {'name': url, 'selectors': selectors}
+    return scrape_site({**spec, 'urls': [url]})
@@ -0,0 +1,85 @@
+"""
+جدولة تكيفية لكل صفحة (متجر في الموفر، مدينة في كوبون، موقع كوبونات، Feed):
+الصفحة التي تظهر فيها عروض جديدة نسحبها أكثر، والراكدة أقل - بين حد أدنى وأقصى لكل مصدر
+"""
+
+import time
+
+from config import SCHEDULE_FILE, SCHEDULE_INTERVALS
+from .content_hash import offer_key
+from .json_state import JsonState
+
+
+# مضاعف الفترة عند ظهور عروض جديدة / عند عدم ظهورها
+SPEEDUP = 0.5
+SLOWDOWN = 1.5
+
+# أقصى عدد بصمات عروض نحفظها لكل صفحة
+MAX_SEEN = 200
+
+
+def _source_settings(source_key) -> dict:
+    settings = dict(SCHEDULE_INTERVALS['default'])
+    settings.update(SCHEDULE_INTERVALS.get(source_key, {}))
+    return settings
+
+
+class Scheduler(JsonState):
+    """لكل رابط: الفترة الحالية وموعد السحب القادم وبصمات آخر عروض ظهرت فيه"""
+
+    label = 'حالة الجدولة'
+    pages = JsonState.data
+
+    def __init__(self, path=SCHEDULE_FILE):
+        super().__init__(path)
+
+    def _entry(self, source_key, url):
+        entry = self.pages.get(url)
+        if entry is None:
+            entry = self.pages[url] = {'source': source_key, 'interval': _source_settings(source_key)['start'], 'next_due': 0, 'seen': []}
+        return entry
+
+    def due(self, source_key, url, now=None) -> bool:
+        """هل حان موعد سحب هذه الصفحة؟ (الصفحة الجديدة مستحقة دائماً)"""
+        entry = self.pages.get(url)
+        return entry is None or (now or time.time()) >= entry['next_due']
+
+    def record(self, source_key, url, offers):
+        """نتيجة سحب ناجح: نقصر الفترة إن ظهرت عروض جديدة ونطيلها إن لم تظهر - يرجع عدد الجديد"""
+        settings = _source_settings(source_key)
+        first_visit = url not in self.pages
+        entry = self._entry(source_key, url)
+        keys = [offer_key(offer) for offer in offers]
+        new = len(set(keys) - set(entry['seen']))
+        if not first_visit:
+            factor = SPEEDUP if new else SLOWDOWN
+            entry['interval'] = min(max(entry['interval'] * factor, settings['min']), settings['max'])
+        entry['seen'] = keys[:MAX_SEEN]
+        entry['new'] = new
+        entry['next_due'] = time.time() + entry['interval']
+        return new
+
+    def postpone(self, source_key, url):
+        """سحب فاشل أو متخطى: نؤجل الصفحة فترتها الحالية بدون تغييرها (قاطع الدائرة يتولى الأعطال)"""
+        entry = self._entry(source_key, url)
+        entry['next_due'] = time.time() + entry['interval']
+
+    def seconds_until_due(self) -> float:
+        if not self.pages:
+            return 0.0
+        return max(min(entry['next_due'] for entry in self.pages.values()) - time.time(), 0.0)
+
+    def summary(self) -> list:
+        """سطر لكل مصدر: عدد الصفحات وأقصر/أطول فترة والطلبات المتوقعة يومياً"""
+        by_source = {}
+        for entry in self.pages.values():
+            by_source.setdefault(entry['source'], []).append(entry['interval'])
+        lines = []
+        for source_key in sorted(by_source):
+            intervals = by_source[source_key]
+            per_day = sum(86400 / interval for interval in intervals)
+            lines.append(f"⏱️ `{source_key}`: {len(intervals)} صفحة - كل {min(intervals) / 60:.0f}-{max(intervals) / 60:.0f} د (~{per_day:.0f} طلب/يوم)")
+        return lines
+
+
+scheduler = Scheduler()
@@ -1,7 +1,14 @@
-import requests
 from datetime import datetime
-from bs4 import BeautifulSoup
-import re
+
+from config import WEBPAGE_SOURCES
+from ..arabic import normalize_text
+from ..content_hash import card_cache
+from ..coupon_fields import extract_fields, find_price, PERCENT_RE
+from ..http_cache import fetch_cached
+from ..request_policy import get as http_get
+from ..parsing import make_soup
+from ..rss_scraper import clean_title
+from ..selector_engine import scrape_site
 
 
 def scrape_almowafir_deals():
@@ -10,14 +17,12 @@ def scrape_almowafir_deals():
     try:
         print("جاري السحب من الموفر...")
         url = "https://almowafir.com/ar/coupons/"
-        response = requests.get(url, timeout=30, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0',
-            'Accept-Language': 'ar,en;q=0.9'
-        })
+        response = http_get(url, timeout=30)
         
         if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            coupons = soup.select('.coupon-card, .deal-card, .offer-box, [class*="coupon"], [class*="deal"]')[:20]
+            cards = '.coupon-card, .deal-card, .offer-box, [class*="coupon"], [class*="deal"]'
+            soup = make_soup(response.text, only=cards)
+            coupons = soup.select(cards)[:20]
             
             for coupon in coupons:
                 discount_el = coupon.select_one('[class*="discount"], [class*="percent"], .badge, .off')
@@ -30,10 +35,9 @@ def scrape_almowafir_deals():
                 if discount_el:
                     discount = discount_el.get_text(strip=True)
                 
-                all_text = coupon.get_text()
-                percent_match = re.search(r'(\d+)\s*%', all_text)
-                if percent_match:
-                    discount = f"{percent_match.group(1)}%"
+                fields = extract_fields(coupon, 'الموفر')
+                if fields.percent:
+                    discount = fields.discount
                 
                 if discount and '%' in discount:
                     store = ""
@@ -73,143 +77,52 @@ def scrape_almowafir_deals():
 
 def scrape_noon_deals():
     """سحب عروض نون السعودية مع الصور"""
-    offers = []
-    try:
-        print("جاري السحب من نون...")
-        url = "https://www.noon.com/saudi-ar/offers/"
-        response = requests.get(url, timeout=30, headers={
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/120.0.0.0'
-        })
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            products = soup.select('[class*="product"], [class*="item"], article')[:15]
-            
-            for prod in products:
-                title_el = prod.select_one('[class*="title"], [class*="name"], h3, h4')
-                price_el = prod.select_one('[class*="price"], [class*="now"]')
-                old_price = prod.select_one('[class*="was"], [class*="old"], del, s')
-                link_el = prod.select_one('a[href]')
-                image_el = prod.select_one('img[src]')
-                
-                if title_el and old_price:
-                    title = clean_title(title_el.get_text(strip=True))
-                    price = price_el.get_text(strip=True) if price_el else ""
-                    link = link_el.get('href', '') if link_el else ""
-                    image_url = ""
-                    if image_el:
-                         image_url = image_el.get('src', '')
-                    
-                    if title and len(title) > 5:
-                        offers.append({
-                            'title': f"عرض نون: {title[:60]}",
-                            'link': link if link.startswith('http') else f"https://noon.com{link}",
-                            'price': price,
-                            'category': 'تخفيضات',
-                            'source': 'نون',
-                            'image_url': image_url,
-                            'description': f"احصل على {title} بسعر {price} فقط! (السعر السابق: {old_price.get_text(strip=True)})",
-                            'date': datetime.now().isoformat()
-                        })
-            print(f"تم استخراج {len(offers)} من نون")
-    except Exception as e:
-        print(f"خطأ نون: {e}")
-    return offers
+    return _scrape_spec("noon", "نون")
 
 
 def scrape_extra_deals():
     """سحب عروض اكسترا مع الصور"""
-    offers = []
-    try:
-        print("جاري السحب من اكسترا...")
-        url = "https://www.extra.com/ar-sa/offers"
-        response = requests.get(url, timeout=30, headers={
-            'User-Agent': 'Mozilla/5.0 Chrome/120.0.0.0'
-        })
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            products = soup.select('.product, .item, article, [class*="product"]')[:15]
-            
-            for prod in products:
-                title_el = prod.select_one('.title, .name, h3, h4, a[title]')
-                price_el = prod.select_one('.price, [class*="price"]')
-                link_el = prod.select_one('a[href]')
-                image_el = prod.select_one('img[src]')
-                
-                if title_el:
-                    title = title_el.get('title') or title_el.get_text(strip=True)
-                    title = clean_title(title)
-                    price = price_el.get_text(strip=True) if price_el else ""
-                    link = link_el.get('href', '') if link_el else ""
-                    image_url = ""
-                    if image_el:
-                        image_url = image_el.get('src', '')
-                        if image_url and not image_url.startswith('http'):
-                            image_url = f"https://www.extra.com{image_url}"
+    return _scrape_spec("extra", "اكسترا")
 
-                    if title and len(title) > 5:
-                        offers.append({
-                            'title': f"عرض اكسترا: {title[:60]}",
-                            'link': link if link.startswith('http') else f"https://extra.com{link}",
-                            'price': price,
-                            'category': 'إلكترونيات',
-                            'source': 'اكسترا',
-                            'image_url': image_url,
-                            'description': f"عرض خاص من اكسترا على {title}. السعر الحالي: {price}",
-                            'date': datetime.now().isoformat()
-                        })
-            print(f"تم استخراج {len(offers)} من اكسترا")
-    except Exception as e:
-        print(f"خطأ اكسترا: {e}")
-    return offers
 
 def scrape_cobone_deals():
     """سحب عروض المطاعم من كوبون"""
-    offers = []
-    try:
-        print("جاري السحب من كوبون (مطاعم)...")
-        # نسحب من الرياض وجدة
-        urls = [
-            "https://www.cobone.com/ar/deals/riyadh/food-dining",
-            "https://www.cobone.com/ar/deals/jeddah/food-dining"
-        ]
-        
-        for url in urls:
-            response = requests.get(url, timeout=30, headers={'User-Agent': 'Mozilla/5.0'})
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.text, 'html.parser')
-                deals = soup.select('.deal-box, .deal_item')[:10]
-                
-                for deal in deals:
-                    title_el = deal.select_one('.title, h3, h2')
-                    price_el = deal.select_one('.price, .actual-price')
-                    img_el = deal.select_one('img')
-                    link_el = deal.select_one('a')
-                    
-                    if title_el and link_el:
-                        title = clean_title(title_el.get_text(strip=True))
-                        price = price_el.get_text(strip=True) if price_el else "خصم خاص"
-                        link = link_el.get('href')
-                        if link and not link.startswith('http'):
-                            link = f"https://www.cobone.com{link}"
-                            
-                        image_url = img_el.get('data-original') or img_el.get('src') if img_el else ""
-                        
-                        offers.append({
-                            'title': title,
-                            'link': link,
-                            'price': price,
-                            'category': 'مطاعم',
-                            'source': 'كوبون',
-                            'image_url': image_url,
-                            'description': f"عرض مطاعم مميز: {title} بسعر {price}",
-                            'date': datetime.now().isoformat()
-                        })
-        print(f"تم استخراج {len(offers)} عرض مطاعم")
-    except Exception as e:
-        print(f"خطأ كوبون: {e}")
-    return offers
+    return _scrape_spec("cobone", "كوبون (مطاعم)")
+
+
+DELIVERY_TARGETS = [
+    ("https://almowafir.com/ar/stores/hungerstation/", "هنقرستيشن"),
+    ("https://almowafir.com/ar/stores/toyou/", "تويو"),
+    ("https://almowafir.com/ar/stores/noon-food/", "نون فود"),
+    ("https://almowafir.com/ar/stores/jahez/", "جاهز"),
+    ("https://almowafir.com/ar/stores/mrsool/", "مرسول")
+]
+
+
+def _delivery_coupon_offer(coupon, url, app_name):
+    """عرض واحد من بطاقة .coupon-card في صفحة تطبيق توصيل"""
+    fields = extract_fields(coupon, 'تطبيقات التوصيل')
+    code = fields.code or "رابط مباشر"
+    desc = fields.summary or fields.heading or f"كوبون {app_name}"
+    
+    return {
+        'title': f"كوبون {app_name}: {desc}",
+        'link': url,
+        'price': code,
+        'category': 'تطبيقات',
+        'source': app_name,
+        'image_url': "",
+        'description': f"استخدم الكود ({code}) للحصول على الخصم في تطبيق {app_name}.",
+        'expires_at': fields.expires,
+        'date': datetime.now().isoformat()
+    }
+
+
+def parse_delivery_page(html, url, app_name):
+    cards = '.coupon-card, [class*="offer-box"]'
+    soup = make_soup(html, only=cards)
+    coupons = soup.select(cards)[:3]
+    return [card_cache.extract(coupon, _delivery_coupon_offer, url, app_name) for coupon in coupons]
 
 
 def scrape_delivery_apps():
@@ -217,40 +130,9 @@ def scrape_delivery_apps():
     offers = []
     try:
         print("جاري سحب كوبونات التوصيل...")
-        targets = [
-            ("https://almowafir.com/ar/stores/hungerstation/", "هنقرستيشن"),
-            ("https://almowafir.com/ar/stores/toyou/", "تويو"),
-            ("https://almowafir.com/ar/stores/noon-food/", "نون فود"),
-            ("https://almowafir.com/ar/stores/jahez/", "جاهز"),
-            ("https://almowafir.com/ar/stores/mrsool/", "مرسول")
-        ]
-        
-        headers = {'User-Agent': 'Mozilla/5.0'}
-        
-        for url, app_name in targets:
+        for url, app_name in DELIVERY_TARGETS:
             try:
-                resp = requests.get(url, headers=headers, timeout=20)
-                if resp.status_code == 200:
-                    soup = BeautifulSoup(resp.text, 'html.parser')
-                    coupons = soup.select('.coupon-card, [class*="offer-box"]')[:3]
-                    
-                    for coupon in coupons:
-                        code_el = coupon.select_one('.code-text, .coupon-code')
-                        desc_el = coupon.select_one('h3, .title')
-                        
-                        code = code_el.get_text(strip=True) if code_el else "رابط مباشر"
-                        desc = desc_el.get_text(strip=True) if desc_el else f"كوبون {app_name}"
-                        
-                        offers.append({
-                            'title': f"كوبون {app_name}: {desc}",
-                            'link': url,
-                            'price': code,
-                            'category': 'تطبيقات',
-                            'source': app_name,
-                            'image_url': "",
-                            'description': f"استخدم الكود ({code}) للحصول على الخصم في تطبيق {app_name}.",
-                            'date': datetime.now().isoformat()
-                        })
+                offers.extend(fetch_cached('تطبيقات التوصيل', url, parse_delivery_page, app_name, timeout=20))
             except: continue
             
         print(f"تم استخراج {len(offers)} كوبون توصيل")
@@ -261,78 +143,30 @@ def scrape_delivery_apps():
 
 def scrape_ilofo_deals():
     """سحب عروض المطاعم والقهوة (والبنوك) من موقع عروض (ilofo)"""
+    return _scrape_spec("ilofo", "عروض (ilofo)")
+
+
+def _scrape_spec(key, label):
+    """تشغيل مواصفة من config.WEBPAGE_SOURCES عبر المحرك العام"""
     offers = []
     try:
-        print("جاري السحب من عروض (ilofo)...")
-        # صفحة المطاعم والمقاهي (غالباً تحتوي على 1+1 وعروض القهوة)
-        url = "https://www.ilofo.com/saudi/offers/restaurants"
-        
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=30)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            # Select offer blocks
-            offer_blocks = soup.select('.col-md-3, .offer-box, .card')[:15]
-            
-            for block in offer_blocks:
-                title_el = block.select_one('.card-title, h5, h4, a[title]')
-                img_el = block.select_one('img')
-                link_el = block.select_one('a')
-                
-                if title_el and img_el:
-                    title = clean_title(title_el.get_text(strip=True))
-                    image_url = img_el.get('src') or img_el.get('data-src')
-                    if image_url and not image_url.startswith('http'):
-                        image_url = f"https://www.ilofo.com{image_url}"
-                        
-                    # Filter for keywords: Bank, Free, 1+1, Coffee
-                    keywords = ['مجانا', '1+1', 'بنك', 'الراجحي', 'قهوة', 'riyal', 'ريال']
-                    # We take mostly everything from here as it's targeted flyers, but checking keywords helps prioritization
-                    # For now, take all restaurant offers found
-                    
-                    details_link = link_el.get('href') if link_el else ""
-                    if details_link and not details_link.startswith('http'):
-                        details_link = f"https://www.ilofo.com{details_link}"
-                        
-                    offers.append({
-                        'title': title,
-                        'link': details_link or url,
-                        'price': "عرض نشرة", # Flyers often have multiple prices
-                        'category': 'مطاعم/بنوك',
-                        'source': 'ilofo',
-                        'image_url': image_url,
-                        'description': f"شاهد تفاصيل العرض: {title}. قد يحتوي على عروض 1+1 أو خصومات بنكية.",
-                        'date': datetime.now().isoformat()
-                    })
-                    
-        print(f"تم استخراج {len(offers)} عرض من ilofo")
+        print(f"جاري السحب من {label}...")
+        offers = scrape_site(WEBPAGE_SOURCES[key])
+        print(f"تم استخراج {len(offers)} عرض من {label}")
     except Exception as e:
-        print(f"خطأ ilofo: {e}")
+        print(f"خطأ {label}: {e}")
     return offers
 
 
-def clean_title(title: str) -> str:
-    if not title:
-        return ""
-    title = re.sub(r'<[^>]+>', '', title)
-    title = title.replace('*', '').replace('_', '').replace('[', '').replace(']', '')
-    title = ' '.join(title.split())
-    return title[:100] if title else ""
-
-
 def extract_price(text: str) -> str:
     if not text:
         return ""
-    patterns = [r'\d+%', r'\d+\s*(?:ريال|ر\.س|SAR)']
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
-        if match:
-            return match.group()
-    return ""
+    # ٥٠٪ و ١٩٩ ريال تصبح 50% و 199 ريال قبل البحث (التعبيرات مجمعة مسبقاً في coupon_fields)
+    text = normalize_text(text)
+    percent = PERCENT_RE.search(text)
+    if percent:
+        return f"{percent.group(1)}%"
+    return find_price(text)
 
 
 def fetch_rss_offers(feed_url: str, feed_name: str, category: str):
@@ -384,4 +218,5 @@ def fetch_all_rss_feeds(feeds: list):
 
 
 def fetch_webpage_offers(url: str, selectors: dict):
-    return []
+    from ..rss_scraper import fetch_webpage_offers as _fetch_webpage_offers
+    return _fetch_webpage_offers(url, selectors)
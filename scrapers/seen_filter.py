@@ -0,0 +1,80 @@
+"""
+مجموعة العروض المحفوظة في الذاكرة (Bloom Filter بحجم ثابت) أمام save_offer:
+العرض المعروف يُسقط بدون فتح اتصال SQLite، وتُملأ من قاعدة البيانات عند التشغيل
+المفتاح هو هوية العرض في قاعدة البيانات (الرابط, كود الكوبون) - كوبونات صفحة المتجر تشترك في رابطها
+"""
+
+import hashlib
+import math
+import threading
+
+from config import SEEN_FILTER_CAPACITY, SEEN_FILTER_ERROR_RATE
+from .canonical import url_key
+
+
+class BloomFilter:
+    """Bloom Filter بسيط: k دالة تجزئة مشتقة من blake2b واحدة (double hashing)"""
+
+    def __init__(self, capacity, error_rate):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8', 'ignore'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def clear(self):
+        self.bits = bytearray(len(self.bits))
+        self.count = 0
+
+
+def _key(link, code='') -> str:
+    key = url_key(link)
+    return f"{key}|{code}" if code else key
+
+
+class SeenLinks:
+    """العروض التي مرت على قاعدة البيانات (url_key للرابط + الكود)"""
+
+    def __init__(self, capacity=SEEN_FILTER_CAPACITY, error_rate=SEEN_FILTER_ERROR_RATE):
+        self.filter = BloomFilter(capacity, error_rate)
+        self.lock = threading.Lock()
+        self.skipped = 0
+
+    def warm(self, keys):
+        """ملء المجموعة من (الرابط, الكود) لعروض قاعدة البيانات عند التشغيل"""
+        with self.lock:
+            for link, code in keys:
+                self.filter.add(_key(link, code))
+        print(f"🧠 روابط معروفة: {self.filter.count} ({len(self.filter.bits) // 1024}KB)")
+
+    def seen(self, link, code='') -> bool:
+        with self.lock:
+            if _key(link, code) in self.filter:
+                self.skipped += 1
+                return True
+        return False
+
+    def add(self, link, code=''):
+        with self.lock:
+            self.filter.add(_key(link, code))
+
+    def clear(self):
+        with self.lock:
+            self.filter.clear()
+            self.skipped = 0
+
+
+seen_links = SeenLinks()
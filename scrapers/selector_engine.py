@@ -0,0 +1,167 @@
+"""
+محرك سحب عام يعمل بمواصفات CSS لكل موقع (config.WEBPAGE_SOURCES)
+والمواقع المبنية بـ JavaScript نقرأ منتجاتها من JSON المضمن في الصفحة أولاً (embedded_json)
+إضافة متجر جديد = إضافة مواصفة في الإعدادات بدل كتابة دالة جديدة
+"""
+
+from datetime import datetime
+from functools import partial
+from urllib.parse import urljoin
+
+import soupsieve as sv
+
+from .content_hash import card_cache
+from .embedded_json import extract_products
+from .http_cache import fetch_cached
+from .parsing import make_soup
+from .rss_scraper import clean_title
+
+
+# الحقول المدعومة: هل نأخذ النص إذا لم توجد أي خاصية، وما الخصائص التي نجربها بالترتيب
+FIELDS = {
+    'title': (True, ()),
+    'price': (True, ()),
+    'old_price': (True, ()),
+    'code': (True, ('data-code', 'data-coupon', 'data-clipboard-text')),
+    'link': (False, ('href',)),
+    'image': (False, ('data-original', 'data-src', 'src')),
+}
+
+# حقول روابط تُحوّل إلى روابط كاملة
+URL_FIELDS = ('link', 'image')
+
+_compiled = {}
+
+
+def compile_spec(spec) -> dict:
+    """تجميع محددات CSS مرة واحدة لكل مواصفة وإعادة استخدامها لكل بطاقة"""
+    key = spec['name']
+    compiled = _compiled.get(key)
+    if compiled is None:
+        selectors = spec['selectors']
+        attrs = spec.get('attrs', {})
+        fields = []
+        for field, selector in selectors.items():
+            if field == 'container':
+                continue
+            use_text, default_attrs = FIELDS[field]
+            fields.append((field, sv.compile(selector), tuple(attrs.get(field, default_attrs)), use_text))
+        compiled = {
+            'container': sv.compile(selectors['container']),
+            'fields': fields,
+        }
+        _compiled[key] = compiled
+    return compiled
+
+
+def _field_value(card, matcher, attrs, use_text):
+    el = matcher.select_one(card)
+    if el is None:
+        return ""
+    for attr in attrs:
+        value = el.get(attr)
+        if value:
+            return value.strip()
+    return el.get_text(strip=True) if use_text else ""
+
+
+def extract_card(compiled, spec, card, url, label):
+    """استخراج عرض واحد من بطاقة حسب المواصفة - يرجع None إذا نقص حقل مطلوب"""
+    values = {}
+    for field, matcher, attrs, use_text in compiled['fields']:
+        value = _field_value(card, matcher, attrs, use_text)
+        if value:
+            values[field] = value
+    return build_offer(spec, values, url, label)
+
+
+def build_offer(spec, found, url, label):
+    """تحويل الحقول المستخرجة (من البطاقة أو من JSON الصفحة) إلى عرض حسب المواصفة - None إذا نقص حقل مطلوب"""
+    values = dict(spec.get('defaults', {}))
+    values.update((field, value) for field, value in found.items() if value)
+    
+    for field in spec.get('required', ()):
+        if not values.get(field):
+            return None
+    
+    values['title'] = clean_title(values.get('title', ''))
+    if len(values['title']) < spec.get('min_title_length', 1):
+        return None
+    
+    base_url = spec.get('base_url') or url
+    for field in URL_FIELDS:
+        if values.get(field):
+            values[field] = urljoin(base_url, values[field])
+    values.setdefault('link', url)
+    values['label'] = label
+    for field in FIELDS:
+        values.setdefault(field, "")
+    
+    return {
+        'title': spec.get('title_format', '{title}').format(**values),
+        'link': values['link'],
+        'price': values['price'] or values['code'],
+        'category': spec.get('category', 'عروض متنوعة'),
+        'source': spec.get('source', spec['name']),
+        'image_url': values['image'],
+        'description': spec.get('description_format', '{title}').format(**values),
+        'date': datetime.now().isoformat()
+    }
+
+
+def parse_embedded(html, url, label, spec):
+    """المسار السريع: المنتجات من JSON المضمن في الصفحة بدون بناء شجرة HTML"""
+    offers = []
+    for product in extract_products(html, spec.get('json_templates')):
+        offer = build_offer(spec, product, url, label)
+        if offer:
+            offers.append(offer)
+        if spec.get('limit') and len(offers) >= spec['limit']:
+            break
+    return offers
+
+
+def parse_webpage(html, url, label, spec):
+    """حلقة الاستخراج الموحدة لكل المواقع (JSON المضمن أولاً إن فعّلته المواصفة ثم بطاقات HTML)"""
+    if spec.get('embedded_json'):
+        offers = parse_embedded(html, url, label, spec)
+        if offers:
+            return offers
+    compiled = compile_spec(spec)
+    soup = make_soup(html, only=spec['selectors']['container'])
+    cards = compiled['container'].select(soup, limit=spec.get('limit', 0))
+    extract = partial(extract_card, compiled, spec)
+    offers = []
+    for card in cards:
+        # البطاقات غير المتغيرة تؤخذ من الكاش بدون إعادة استخراج
+        offer = card_cache.extract(card, extract, url, label)
+        if offer:
+            offers.append(offer)
+    return offers
+
+
+def spec_pages(spec):
+    return [(url, spec.get('source', spec['name'])) for url in spec['urls']]
+
+
+def spec_source(key, spec) -> dict:
+    """تحويل مواصفة موقع إلى مصدر في محرك السحب"""
+    return {
+        'key': key,
+        'name': spec['name'],
+        'pages': partial(spec_pages, spec),
+        'parse': partial(parse_webpage, spec=spec),
+        'cards': spec['selectors']['container'],
+        'timeout': spec.get('timeout', 15),
+    }
+
+
+def scrape_site(spec):
+    """سحب متزامن لكل صفحات مواصفة واحدة"""
+    offers = []
+    for url, label in spec_pages(spec):
+        try:
+            offers.extend(fetch_cached(spec['name'], url, parse_webpage, label, spec, timeout=spec.get('timeout', 15)))
+        except Exception as e:
+            print(f"خطأ {spec['name']}: {e}")
+    return offers
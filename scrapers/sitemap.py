@@ -0,0 +1,165 @@
+"""
+اكتشاف المتاجر من sitemap.xml بدل قوائم ثابتة (config.SITEMAPS):
+قراءة تدفقية (XMLPullParser) تدعم ملفات .gz، وفهرس متاجر محفوظ مع lastmod لكل متجر
+المتجر المفهرس لا يُسحب في الدورات العادية إلا إذا تغير lastmod منذ آخر سحب ناجح
+(أو مضى STORE_REFETCH_AFTER على آخر سحب حتى يتجدد آخر ظهور كوبوناته قبل أن تُعتبر منتهية)
+"""
+
+import re
+import time
+import xml.etree.ElementTree as ET
+import zlib
+
+from config import SITEMAPS, STORE_INDEX_FILE, SITEMAP_MAX_FILES, STORE_REFETCH_AFTER
+from .json_state import JsonState
+from .request_policy import get as http_get
+
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+GZIP_MAGIC = b'\x1f\x8b'
+CHUNK_SIZE = 64 * 1024
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_sitemap(url, timeout=30):
+    """
+    يولد ('sitemap' أو 'url', loc, lastmod) لكل عنصر أثناء التنزيل: الرد يُغذى لـ XMLPullParser
+    على دفعات CHUNK_SIZE (مع فك gzip) بدل تحميل الملف كله
+    """
+    resp = http_get(url, timeout=timeout, stream=True)
+    try:
+        if resp.status_code != 200:
+            raise ValueError(f"HTTP {resp.status_code}")
+        parser = ET.XMLPullParser(events=('end',))
+        gunzip = None
+        for chunk in resp.iter_content(CHUNK_SIZE):
+            # ملف .xml.gz (ليس Content-Encoding): نفك الضغط أثناء القراءة
+            if gunzip is None:
+                gunzip = zlib.decompressobj(wbits=31) if chunk[:2] == GZIP_MAGIC else False
+            parser.feed(gunzip.decompress(chunk) if gunzip else chunk)
+            for _, elem in parser.read_events():
+                kind = _local(elem.tag)
+                if kind not in ('url', 'sitemap'):
+                    continue
+                loc = elem.findtext(f'{SITEMAP_NS}loc') or elem.findtext('loc') or ''
+                lastmod = elem.findtext(f'{SITEMAP_NS}lastmod') or elem.findtext('lastmod') or ''
+                yield kind, loc.strip(), lastmod.strip()
+                elem.clear()
+        parser.close()
+    finally:
+        resp.close()
+
+
+class StoreIndex(JsonState):
+    """
+    لكل موقع: lastmod لكل ملف sitemap فرعي، ولكل متجر lastmod وآخر lastmod سحبناه عنده
+    الاكتشاف يعمل في خيط منفصل بينما يقرأ المحرك الفهرس (self.lock)
+    """
+
+    label = 'فهرس المتاجر'
+    sites = JsonState.data
+
+    def __init__(self, path=STORE_INDEX_FILE):
+        super().__init__(path)
+        self._by_url = {}
+
+    def loaded(self, data):
+        self._by_url = {store_url: store for site in data.values() for store_url, store in site.get('stores', {}).items()}
+
+    def _store(self, url):
+        """المتجر المفهرس بهذا الرابط أو None (أول استخدام يقرأ الفهرس ويبني _by_url)"""
+        self.load()
+        return self._by_url.get(url)
+
+    def discover(self, site_key, spec) -> int:
+        """تحديث فهرس موقع واحد - نتخطى ملفات sitemap الفرعية التي لم يتغير lastmod لها، ويرجع عدد المتاجر المتغيرة"""
+        with self.lock:
+            site = self.sites.setdefault(site_key, {'sitemaps': {}, 'stores': {}})
+        pattern = re.compile(spec['store_pattern'])
+        # (رابط الـ sitemap, lastmod له في الفهرس الأب)
+        queue = [(spec['url'], None)]
+        files = 0
+        changed = 0
+        while queue and files < SITEMAP_MAX_FILES:
+            sitemap_url, sitemap_lastmod = queue.pop(0)
+            files += 1
+            try:
+                for kind, loc, lastmod in iter_sitemap(sitemap_url):
+                    if kind == 'sitemap':
+                        if not lastmod or site['sitemaps'].get(loc) != lastmod:
+                            queue.append((loc, lastmod))
+                        continue
+                    match = pattern.search(loc)
+                    if not match:
+                        continue
+                    store_url = spec['store_url'].format(slug=match.group(1))
+                    with self.lock:
+                        store = site['stores'].get(store_url)
+                        if store is None:
+                            store = site['stores'][store_url] = {'slug': match.group(1), 'lastmod': lastmod, 'fetched': None}
+                            self._by_url[store_url] = store
+                            changed += 1
+                        elif lastmod and store['lastmod'] != lastmod:
+                            store['lastmod'] = lastmod
+                            changed += 1
+            except Exception as e:
+                # لا نحفظ lastmod له حتى نعيد قراءته في المرة القادمة
+                print(f"⚠️ sitemap {sitemap_url}: {e}")
+                continue
+            if sitemap_lastmod:
+                with self.lock:
+                    site['sitemaps'][sitemap_url] = sitemap_lastmod
+        return changed
+
+    def stores(self, site_key, max_stores=None) -> list:
+        """[(رابط المتجر, slug)] - الأحدث تعديلاً أولاً"""
+        with self.lock:
+            stores = list(self.sites.get(site_key, {}).get('stores', {}).items())
+        ordered = sorted(stores, key=lambda item: item[1].get('lastmod') or '', reverse=True)
+        return [(store_url, store['slug']) for store_url, store in ordered[:max_stores]]
+
+    def moved(self, url):
+        """
+        None للرابط غير المفهرس (أو بدون lastmod - تتولاه الجدولة)،
+        وإلا هل تغير lastmod منذ آخر سحب ناجح أو مضى عليه STORE_REFETCH_AFTER
+        """
+        store = self._store(url)
+        if store is None or not store['lastmod']:
+            return None
+        return store['fetched'] != store['lastmod'] or time.time() - store.get('fetched_at', 0) >= STORE_REFETCH_AFTER
+
+    def fetched(self, url):
+        """بعد سحب ناجح للصفحة: لا نسحبها ثانية حتى يتغير lastmod"""
+        with self.lock:
+            store = self._store(url)
+            if store is not None:
+                store['fetched'] = store['lastmod']
+                store['fetched_at'] = int(time.time())
+                store.pop('failed_at', None)
+
+    def failed(self, url):
+        """بعد سحب فاشل للصفحة: تبقى متغيرة (moved) لكن إعادة المحاولة تنتظر تأجيل الجدولة"""
+        with self.lock:
+            store = self._store(url)
+            if store is not None:
+                store['failed_at'] = int(time.time())
+
+    def failing(self, url) -> bool:
+        """هل فشل آخر سحب للصفحة المفهرسة (ولم ينجح بعده)؟"""
+        store = self._store(url)
+        return store is not None and 'failed_at' in store
+
+
+store_index = StoreIndex()
+
+
+def discover_stores():
+    """وظيفة الاكتشاف الدورية (متزامنة - تُشغل في خيط منفصل)"""
+    for site_key, spec in SITEMAPS.items():
+        changed = store_index.discover(site_key, spec)
+        total = len(store_index.sites.get(site_key, {}).get('stores', {}))
+        print(f"🗺️ {site_key}: {total} متجر في الفهرس ({changed} جديد/متغير)")
+    store_index.save()
@@ -0,0 +1,171 @@
+"""
+أرشيف صفحات HTML الخام (اختياري - config.SNAPSHOTS_ENABLED): كل رد 200 يُحفظ مضغوطاً (zstd إن وُجد وإلا gzip)
+باسم بصمة محتواه، فالصفحة التي لم تتغير لا تُخزن مرتين، مع حدود للعمر وعدد النسخ لكل رابط والحجم الكلي
+ووضع إعادة التشغيل (replay): التحليل من آخر نسخة محفوظة لكل صفحة بدون أي طلب للمواقع
+(fetch_all_rss_feeds(feeds, replay=True) أو benchmarks/replay_snapshots.py)
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from config import SNAPSHOTS_ENABLED, SNAPSHOT_DIR, SNAPSHOT_KEEP_PER_URL, SNAPSHOT_MAX_AGE, SNAPSHOT_MAX_BYTES
+from .json_state import read_json, write_json
+
+try:
+    import zstandard
+    _CODEC = 'zst'
+except ImportError:
+    zstandard = None
+    _CODEC = 'gz'
+
+
+def _compress(data: bytes, codec) -> bytes:
+    if codec == 'zst':
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _decompress(data: bytes, codec) -> bytes:
+    if codec == 'zst':
+        if zstandard is None:
+            raise RuntimeError("النسخة مضغوطة بـ zstd ومكتبة zstandard غير مثبتة")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+class SnapshotResponse:
+    """نسخة محفوظة بنفس واجهة الاستجابة التي تستخدمها دوال التحليل"""
+
+    status_code = 200
+
+    def __init__(self, url, content, encoding, headers):
+        self.url = url
+        self.content = content
+        self.encoding = encoding
+        self.headers = headers
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+
+class SnapshotStore:
+    """objects/<بصمة>.<zst|gz> للمحتوى، و index.json: لكل رابط قائمة نسخه (الأحدث آخراً)"""
+
+    def __init__(self, directory=SNAPSHOT_DIR, enabled=SNAPSHOTS_ENABLED):
+        self.directory = directory
+        self.enabled = enabled
+        self.index_path = os.path.join(directory, 'index.json')
+        self.index = None
+        self.lock = threading.Lock()
+
+    def _load_index(self):
+        if self.index is None:
+            self.index = read_json(self.index_path, 'فهرس النسخ المحفوظة')
+        return self.index
+
+    def _object_path(self, digest, codec):
+        return os.path.join(self.directory, 'objects', digest[:2], f"{digest}.{codec}")
+
+    def save(self, url, resp):
+        """حفظ محتوى رد 200 (يعمل في خيط) - المحتوى المكرر يضيف سطراً في الفهرس فقط"""
+        content = resp.content
+        digest = hashlib.sha256(content).hexdigest()
+        path = self._object_path(digest, _CODEC)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.tmp.{threading.get_ident()}"
+            with open(tmp_path, 'wb') as f:
+                f.write(_compress(content, _CODEC))
+            os.replace(tmp_path, path)
+        entry = {
+            'digest': digest,
+            'codec': _CODEC,
+            'at': int(time.time()),
+            'encoding': resp.encoding,
+            'content_type': resp.headers.get('Content-Type'),
+            'size': os.path.getsize(path),
+        }
+        with self.lock:
+            entries = self._load_index().setdefault(url, [])
+            if entries and entries[-1]['digest'] == digest:
+                entries[-1]['at'] = entry['at']
+            else:
+                entries.append(entry)
+
+    def has(self, url) -> bool:
+        with self.lock:
+            return bool(self._load_index().get(url))
+
+    def load(self, url):
+        """آخر نسخة محفوظة للرابط أو None"""
+        with self.lock:
+            entries = self._load_index().get(url)
+            entry = dict(entries[-1]) if entries else None
+        if entry is None:
+            return None
+        with open(self._object_path(entry['digest'], entry['codec']), 'rb') as f:
+            content = _decompress(f.read(), entry['codec'])
+        headers = {'Content-Type': entry['content_type']} if entry.get('content_type') else {}
+        return SnapshotResponse(url, content, entry.get('encoding'), headers)
+
+    def prune(self):
+        """تطبيق حدود الاحتفاظ ثم حذف المحتوى الذي لم يعد أي رابط يشير إليه"""
+        with self.lock:
+            index = self._load_index()
+            oldest = time.time() - SNAPSHOT_MAX_AGE
+            for url in list(index):
+                entries = [entry for entry in index[url] if entry['at'] >= oldest][-SNAPSHOT_KEEP_PER_URL:]
+                if entries:
+                    index[url] = entries
+                else:
+                    del index[url]
+
+            # فوق الحجم الكلي: نحذف الأقدم أولاً
+            sizes = {entry['digest']: entry['size'] for entries in index.values() for entry in entries}
+            if sum(sizes.values()) > SNAPSHOT_MAX_BYTES:
+                by_age = sorted((entry['at'], url, entry['digest']) for url, entries in index.items() for entry in entries)
+                refs = {}
+                for _, _, digest in by_age:
+                    refs[digest] = refs.get(digest, 0) + 1
+                total = sum(sizes.values())
+                for _, url, digest in by_age:
+                    if total <= SNAPSHOT_MAX_BYTES:
+                        break
+                    index[url] = [entry for entry in index[url] if entry['digest'] != digest]
+                    if not index[url]:
+                        del index[url]
+                    refs[digest] -= 1
+                    if refs[digest] == 0:
+                        total -= sizes[digest]
+
+            referenced = {entry['digest'] for entries in index.values() for entry in entries}
+            objects_dir = os.path.join(self.directory, 'objects')
+            removed = 0
+            for root, _, files in os.walk(objects_dir):
+                for name in files:
+                    if name.split('.')[0] not in referenced:
+                        os.remove(os.path.join(root, name))
+                        removed += 1
+            return removed
+
+    def save_index(self):
+        with self.lock:
+            if self.index is None:
+                return
+            data = json.dumps(self.index, ensure_ascii=False)
+        os.makedirs(self.directory, exist_ok=True)
+        write_json(self.index_path, data, 'فهرس النسخ المحفوظة')
+
+    def stats(self) -> dict:
+        with self.lock:
+            index = self._load_index()
+            sizes = {entry['digest']: entry['size'] for entries in index.values() for entry in entries}
+            return {'urls': len(index), 'objects': len(sizes), 'bytes': sum(sizes.values())}
+
+
+snapshots = SnapshotStore()
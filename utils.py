@@ -1,10 +1,11 @@
 import os
-import requests
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
 import arabic_reshaper
 from bidi.algorithm import get_display
 
+from scrapers.http_client import get as http_get
+
 # Font
 FONT_URL = "https://github.com/googlefonts/noto-fonts/raw/main/hinted/ttf/NotoSansArabic/NotoSansArabic-Bold.ttf"
 FONT_FILE = "NotoSansArabic-Bold.ttf"
@@ -15,7 +16,7 @@ def load_arabic_font(size):
     if not os.path.exists(FONT_FILE):
         try:
             print("⬇️ تحميل الخط...")
-            resp = requests.get(FONT_URL, timeout=30)
+            resp = http_get(FONT_URL, timeout=30)
             with open(FONT_FILE, "wb") as f:
                 f.write(resp.content)
             print("✅ تم تحميل الخط")